@@ -1,18 +1,44 @@
+import time
+
+# Reference point for the time-to-first-window measurement
+_START_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
-import cv2
 import os
 import threading
-import time
-import datetime
+import queue
+import importlib.util
 import sys
-import PIL.Image, PIL.ImageTk
-from utils import save_video, ensure_dir, get_timestamp
+import datetime
+from utils import ensure_dir, get_timestamp, frame_to_preview, motion_thumbnail, motion_score
+import instrument
+from profiler import SamplingProfiler
+from camera import CameraManager
+from encoders import DEFAULT_STORAGE_PROFILE
+from save_queue import SaveQueue, SaveJob
+from search_index import SearchIndex
+from rollups import EmotionRollups
 
 # Ensure videos directory exists
 videos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
 ensure_dir(videos_dir)
 
+# Trained emotion model; when present, saved entries also update the personalised copy
+model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "emotion_model.h5")
+personal_model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "emotion_model_personal.h5")
+# Class folders define the model's output order; resolve them like the model, not from the cwd
+train_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "train")
+
+# History cards are widgets, so only the best matches are drawn
+MAX_HISTORY_RESULTS = 100
+ALL_EMOTIONS = "All emotions"
+
+# "Skip still frames" recording: a frame is stored only when this fraction of
+# the scene has moved since the last stored one, or MAX_STILL_GAP seconds passed
+MOTION_THRESHOLD = 0.003
+MAX_STILL_GAP = 1.0
+
 # Modern UI color scheme
 COLORS = {
     "primary": "#4361EE",     # Primary accent color
@@ -27,6 +53,18 @@ COLORS = {
     "border": "#DEE2E6"       # Border color
 }
 
+# Card and chart colors per emotion
+EMOTION_COLORS = {
+    "happy": "#4CAF50",     # Green
+    "sad": "#2196F3",       # Blue
+    "anxious": "#FF9800",   # Orange
+    "angry": "#F44336",     # Red
+    "calm": "#26A69A",      # Teal
+    "grateful": "#AB47BC",  # Purple
+    "confused": "#8D6E63",  # Brown
+    "other": "#78909C",     # Grey
+}
+
 class ModernButton(tk.Button):
     """A modern styled button with hover effects"""
     def __init__(self, master=None, **kwargs):
@@ -100,52 +138,166 @@ class EmotionalJournalApp:
         self.record_frame = ModernFrame(root, bg=COLORS["light"])
         self.history_frame = ModernFrame(root, bg=COLORS["light"])
         self.playback_frame = ModernFrame(root, bg=COLORS["light"])
+        self.dashboard_frame = ModernFrame(root, bg=COLORS["light"])
         
         # Variables for recording
         self.recording = False
         self.frames = []
+        self.frame_times = []  # Capture times of self.frames when skipping still frames
+        self.motion_gated = False
+        self.latest_frame = None
         self.cap = None
+        self.capture_thread = None
+        self.capture_fps = 20  # Replaced by the measured rate after each recording
         self.video_path = None
+        self.camera = CameraManager()
+        self.waited_cap = None  # Set by the camera-wait thread when Start had to wait
         
-        # Initialize all screens
-        self.setup_main_screen()
-        self.setup_record_screen()
-        self.setup_history_screen()
-        self.setup_playback_screen()
+        # Saves run on a worker pool so recording can continue while encoding
+        self.save_queue = SaveQueue(videos_dir)
+        
+        # Search index over saved entries, updated as each save commits. It and the
+        # rollups are loaded by the warm-up, or by whichever screen needs them first
+        self.search_index = None
+        self.rollups = None
+        self.stores_lock = threading.Lock()
+        self.save_queue.commit_hooks.append(self.index_saved_entry)
+        self.search_after_id = None
+        
+        # Non-blocking notices (e.g. a background save finishing mid-recording)
+        self.notice_label = None
+        self.notice_after_id = None
+        
+        # Hidden diagnostics: Ctrl+Shift+P starts/stops the sampling profiler
+        self.profiler = SamplingProfiler()
+        self.root.bind_all("<Control-Shift-P>", self.toggle_profiler)
+        
+        # Only the main screen is built up front; the others are built on first navigation
+        self.built_screens = set()
+        self.ensure_screen("main")
         
         # Show main screen initially
         self.show_main_screen()
+        
+        # Once the main screen has been drawn, load media libraries and find the camera
+        self.root.after_idle(self.start_warm_up)
+    
+    def ensure_screen(self, name):
+        """Build a screen the first time it is needed"""
+        if name in self.built_screens:
+            return
+        self.built_screens.add(name)
+        with instrument.span("screen.build", screen=name):
+            getattr(self, f"setup_{name}_screen")()
+    
+    def start_warm_up(self):
+        """Warm up cv2, PIL and the camera in a background thread"""
+        threading.Thread(target=self.warm_up, name="warm-up", daemon=True).start()
+    
+    def warm_up(self):
+        with instrument.span("startup.warm_up"):
+            import cv2
+            import PIL.ImageTk
+            
+            # Enumerate devices once; later runs reuse the cached index and modes
+            if self.camera.index is None:
+                self.camera.discover(keep_open=False)
+            
+            self.save_queue.recover()
+            self.ensure_stores()
+            self.enable_personalization()
+            
+            # Pick up entries added or edited outside the app
+            self.search_index.refresh()
+            self.sync_rollups()
+    
+    def ensure_stores(self):
+        """Load the search index and rollups the first time they are needed"""
+        with self.stores_lock:
+            if self.search_index is None:
+                with instrument.span("startup.load_stores"):
+                    self.search_index = SearchIndex(videos_dir)
+                    self.rollups = EmotionRollups(videos_dir)
+    
+    def enable_personalization(self):
+        """Fold each saved entry into the personalised model, if a model and TensorFlow are available"""
+        if not os.path.exists(model_path) or importlib.util.find_spec("tensorflow") is None:
+            return
+        from personalize import Personalizer
+        self.save_queue.commit_hooks.append(Personalizer(model_path, personal_model_path, classes_dir=train_dir))
+    
+    def index_saved_entry(self, job):
+        """Save-queue hook: add a newly committed entry to the search index and rollups"""
+        self.ensure_stores()
+        self.search_index.add_file(job.base)
+        self.search_index.save()
+        self.rollups.add(job.base, job.date, job.emotion)
+        self.rollups.save()
+    
+    def sync_rollups(self):
+        """Bring the emotion rollups in line with the search index"""
+        if self.rollups.sync(dict(self.search_index.docs)):
+            self.rollups.save()
+    
+    def toggle_profiler(self, event=None):
+        """Start or stop sampling all threads and save the collapsed stacks"""
+        if self.profiler.running:
+            path = self.profiler.stop()
+            self.root.title("Emotional Journal")
+            messagebox.showinfo("Profiler", f"Profile saved to:\n{path}")
+        else:
+            self.profiler.start()
+            self.root.title("Emotional Journal [profiling - Ctrl+Shift+P to stop]")
     
     # Navigation functions
+    def release_camera(self):
+        """Stop keeping the camera warm once the record screen is left"""
+        if not self.recording:
+            self.camera.close()
+    
     def show_main_screen(self):
+        self.release_camera()
         self.main_frame.pack(fill=tk.BOTH, expand=True)
         self.record_frame.pack_forget()
         self.history_frame.pack_forget()
         self.playback_frame.pack_forget()
+        self.dashboard_frame.pack_forget()
     
     def show_record_screen(self):
+        self.ensure_screen("record")
+        self.camera.warm_async()
         self.record_frame.pack(fill=tk.BOTH, expand=True)
         self.main_frame.pack_forget()
         self.history_frame.pack_forget()
         self.playback_frame.pack_forget()
+        self.dashboard_frame.pack_forget()
         
         # Reset form when showing this screen
         self.title_entry.delete(0, tk.END)
         self.emotion_var.set("Happy")
         self.journal_text.delete("1.0", tk.END)
         self.frames = []
+        self.frame_times = []
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         self.save_button.config(state=tk.DISABLED)
     
     def show_history_screen(self):
+        self.ensure_screen("history")
+        self.release_camera()
+        self.ensure_stores()
+        if self.search_index.refresh():
+            self.sync_rollups()
         self.load_journal_entries()  # Refresh entries
         self.history_frame.pack(fill=tk.BOTH, expand=True)
         self.main_frame.pack_forget()
         self.record_frame.pack_forget()
         self.playback_frame.pack_forget()
+        self.dashboard_frame.pack_forget()
     
     def show_playback_screen(self, video_path=None):
+        self.ensure_screen("playback")
+        self.release_camera()
         if video_path and os.path.exists(video_path):
             self.video_path = video_path
             # Display the video title
@@ -164,6 +316,18 @@ class EmotionalJournalApp:
         self.main_frame.pack_forget()
         self.record_frame.pack_forget()
         self.history_frame.pack_forget()
+        self.dashboard_frame.pack_forget()
+    
+    def show_dashboard_screen(self):
+        self.ensure_screen("dashboard")
+        self.release_camera()
+        self.ensure_stores()
+        self.draw_dashboard()
+        self.dashboard_frame.pack(fill=tk.BOTH, expand=True)
+        self.main_frame.pack_forget()
+        self.record_frame.pack_forget()
+        self.history_frame.pack_forget()
+        self.playback_frame.pack_forget()
     
     # Setup functions for each screen
     def setup_main_screen(self):
@@ -238,6 +402,26 @@ class EmotionalJournalApp:
             width=20,
         )
         view_button.grid(row=0, column=1)
+        
+        # Dashboard button with icon
+        dashboard_frame = ModernFrame(button_container, bg=COLORS["light"], pady=10)
+        dashboard_frame.pack()
+        
+        dashboard_icon = tk.Canvas(dashboard_frame, width=24, height=24, bg=COLORS["light"], highlightthickness=0)
+        dashboard_icon.create_rectangle(4, 12, 9, 20, fill=COLORS["success"], outline="")
+        dashboard_icon.create_rectangle(10, 4, 15, 20, fill=COLORS["success"], outline="")
+        dashboard_icon.create_rectangle(16, 9, 21, 20, fill=COLORS["success"], outline="")
+        dashboard_icon.grid(row=0, column=0, padx=(0, 10))
+        
+        dashboard_button = ModernButton(
+            dashboard_frame,
+            text="Mood Dashboard",
+            command=self.show_dashboard_screen,
+            bg=COLORS["success"],
+            hover_color=COLORS["secondary"],
+            width=20,
+        )
+        dashboard_button.grid(row=0, column=1)
     
     def setup_record_screen(self):
         # Top navigation bar with title and back button
@@ -487,6 +671,17 @@ class EmotionalJournalApp:
             fg="#666666",
             bg=COLORS["light_accent"]
         ).grid(row=0, column=2, padx=10)
+        
+        # Still stretches (sitting and talking) make up most of a typical entry
+        self.skip_still_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            controls_card,
+            text="Skip still frames (smaller files, faster saving)",
+            variable=self.skip_still_var,
+            font=("Helvetica", 10),
+            bg=COLORS["light_accent"],
+            activebackground=COLORS["light_accent"]
+        ).pack(pady=(0, 5))
 
     def select_emotion(self, emotion):
         """Update the selected emotion"""
@@ -535,6 +730,57 @@ class EmotionalJournalApp:
         content_frame = ModernFrame(self.history_frame, bg=COLORS["light"], padx=30, pady=20)
         content_frame.pack(fill=tk.BOTH, expand=True)
         
+        # Search box with emotion and date-range filters
+        search_bar = tk.Frame(content_frame, bg=COLORS["light"])
+        search_bar.pack(fill=tk.X, pady=(0, 5))
+        
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            search_bar,
+            textvariable=self.search_var,
+            font=("Helvetica", 12),
+            bg="white",
+            relief=tk.SOLID,
+            borderwidth=1
+        )
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=4)
+        search_entry.bind("<KeyRelease>", self.schedule_search)
+        
+        self.emotion_filter = ttk.Combobox(search_bar, values=[ALL_EMOTIONS], state="readonly", width=14)
+        self.emotion_filter.set(ALL_EMOTIONS)
+        self.emotion_filter.pack(side=tk.LEFT, padx=(10, 0))
+        self.emotion_filter.bind("<<ComboboxSelected>>", lambda e: self.load_journal_entries())
+        
+        self.date_from_var = tk.StringVar()
+        self.date_to_var = tk.StringVar()
+        for label, var in (("From", self.date_from_var), ("To", self.date_to_var)):
+            tk.Label(search_bar, text=label, font=("Helvetica", 10), bg=COLORS["light"],
+                     fg=COLORS["dark"]).pack(side=tk.LEFT, padx=(10, 3))
+            date_entry = tk.Entry(search_bar, textvariable=var, width=11, font=("Helvetica", 10),
+                                  bg="white", relief=tk.SOLID, borderwidth=1)
+            date_entry.pack(side=tk.LEFT, ipady=3)
+            date_entry.bind("<KeyRelease>", self.schedule_search)
+        
+        clear_btn = ModernButton(
+            search_bar,
+            text="Clear",
+            command=self.clear_search,
+            bg=COLORS["light_accent"],
+            fg=COLORS["dark"],
+            hover_color=COLORS["border"]
+        )
+        clear_btn.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.results_label = tk.Label(
+            content_frame,
+            text="",
+            font=("Helvetica", 10),
+            bg=COLORS["light"],
+            fg="#666666",
+            anchor="w"
+        )
+        self.results_label.pack(fill=tk.X, pady=(0, 5))
+        
         # Scrollable container for journal entries
         self.entries_container = ModernFrame(content_frame, bg=COLORS["light"], pady=0)
         self.entries_container.pack(fill=tk.BOTH, expand=True)
@@ -632,6 +878,108 @@ class EmotionalJournalApp:
         )
         note.pack()
     
+    def setup_dashboard_screen(self):
+        # Top navigation bar with title and back button
+        nav_bar = ModernFrame(self.dashboard_frame, bg=COLORS["primary"], pady=10)
+        nav_bar.pack(fill=tk.X)
+        
+        back_btn = ModernButton(
+            nav_bar,
+            text="← Back",
+            command=self.show_main_screen,
+            bg=COLORS["primary"],
+            hover_color=COLORS["secondary"],
+            width=8
+        )
+        back_btn.pack(side=tk.LEFT, padx=10)
+        
+        title_label = tk.Label(
+            nav_bar, 
+            text="Mood Dashboard",
+            font=("Helvetica", 16, "bold"),
+            bg=COLORS["primary"],
+            fg="white",
+        )
+        title_label.pack(side=tk.LEFT, expand=True)
+        
+        # Content area
+        content_frame = ModernFrame(self.dashboard_frame, bg=COLORS["light"], padx=30, pady=20)
+        content_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Summary cards: total entries and streaks
+        stats_frame = tk.Frame(content_frame, bg=COLORS["light"])
+        stats_frame.pack(fill=tk.X)
+        self.stat_labels = {}
+        for column, (key, caption) in enumerate([("total", "Entries"),
+                                                 ("current", "Current streak (days)"),
+                                                 ("longest", "Longest streak (days)")]):
+            card = ModernFrame(stats_frame, bg="white", has_shadow=True, padx=20, pady=10)
+            card.grid(row=0, column=column, sticky="ew", padx=5)
+            stats_frame.grid_columnconfigure(column, weight=1)
+            value = tk.Label(card, text="0", font=("Helvetica", 22, "bold"), bg="white", fg=COLORS["primary"])
+            value.pack()
+            tk.Label(card, text=caption, font=("Helvetica", 10), bg="white", fg="#666666").pack()
+            self.stat_labels[key] = value
+        
+        tk.Label(content_frame, text="Entries per emotion", font=("Helvetica", 12, "bold"),
+                 bg=COLORS["light"], fg=COLORS["dark"], anchor="w").pack(fill=tk.X, pady=(20, 5))
+        self.totals_canvas = tk.Canvas(content_frame, height=170, bg="white", highlightthickness=0)
+        self.totals_canvas.pack(fill=tk.X)
+        
+        tk.Label(content_frame, text="Last 12 weeks", font=("Helvetica", 12, "bold"),
+                 bg=COLORS["light"], fg=COLORS["dark"], anchor="w").pack(fill=tk.X, pady=(20, 5))
+        self.weeks_canvas = tk.Canvas(content_frame, height=200, bg="white", highlightthickness=0)
+        self.weeks_canvas.pack(fill=tk.X)
+        
+        # Redraw when the window is resized
+        self.totals_canvas.bind("<Configure>", lambda e: self.draw_dashboard())
+    
+    def draw_dashboard(self):
+        """Draw the dashboard from the stored rollups (no sidecars are read)"""
+        totals = dict(self.rollups.totals)
+        current, longest = self.rollups.streaks()
+        self.stat_labels["total"].config(text=str(sum(totals.values())))
+        self.stat_labels["current"].config(text=str(current))
+        self.stat_labels["longest"].config(text=str(longest))
+        
+        # Horizontal bar per emotion
+        canvas = self.totals_canvas
+        canvas.delete("all")
+        width = max(canvas.winfo_width(), 400)
+        if not totals:
+            canvas.create_text(width / 2, 85, text="No entries yet", font=("Helvetica", 11), fill="#666666")
+        else:
+            rows = sorted(totals.items(), key=lambda item: -item[1])[:8]
+            peak = rows[0][1]
+            row_height = 170 / len(rows)
+            for i, (emotion, count) in enumerate(rows):
+                y = i * row_height + row_height / 2
+                bar_width = (width - 180) * count / peak
+                canvas.create_text(10, y, text=emotion, anchor="w", font=("Helvetica", 10), fill=COLORS["dark"])
+                canvas.create_rectangle(110, y - row_height / 3, 110 + bar_width, y + row_height / 3,
+                                        fill=EMOTION_COLORS.get(emotion.lower(), COLORS["primary"]), outline="")
+                canvas.create_text(118 + bar_width, y, text=str(count), anchor="w",
+                                   font=("Helvetica", 10), fill=COLORS["dark"])
+        
+        # Stacked weekly columns
+        canvas = self.weeks_canvas
+        canvas.delete("all")
+        weeks = self.rollups.recent_weeks()
+        peak = max([sum(counts.values()) for _, counts in weeks] + [1])
+        column_width = (width - 20) / len(weeks)
+        chart_height = 160
+        for i, (week, counts) in enumerate(weeks):
+            x0 = 10 + i * column_width + column_width * 0.15
+            x1 = 10 + (i + 1) * column_width - column_width * 0.15
+            y = chart_height + 10
+            for emotion, count in sorted(counts.items()):
+                height = chart_height * count / peak
+                canvas.create_rectangle(x0, y - height, x1, y,
+                                        fill=EMOTION_COLORS.get(emotion.lower(), COLORS["primary"]), outline="white")
+                y -= height
+            canvas.create_text((x0 + x1) / 2, chart_height + 22, text=week.split("-")[1],
+                               font=("Helvetica", 8), fill="#666666")
+    
     # Recording functions
     def toggle_recording(self):
         if not self.title_entry.get():
@@ -639,45 +987,119 @@ class EmotionalJournalApp:
             return
         
         if not self.recording:
-            # Start recording
-            self.recording = True
-            self.start_button.config(state=tk.DISABLED)
-            self.stop_button.config(state=tk.NORMAL)
-            self.save_button.config(state=tk.NORMAL)
+            # Normally already open: the record screen keeps the camera warm
+            cap = self.camera.try_acquire()
+            if cap is None:
+                # Still being opened or probed; wait off the Tk thread so the UI stays responsive
+                self.start_button.config(state=tk.DISABLED)
+                self.recording_status.config(text="Camera starting...", fg="#666666")
+                waiter = threading.Thread(target=self.wait_for_camera, name="camera-wait", daemon=True)
+                waiter.start()
+                self.poll_camera_start(waiter)
+                return
+            self.begin_recording(cap)
+    
+    def wait_for_camera(self):
+        with instrument.span("camera.acquire"):
+            self.waited_cap = self.camera.acquire()
+    
+    def poll_camera_start(self, waiter):
+        """Start the recording the user asked for once the camera is ready"""
+        if waiter.is_alive():
+            self.root.after(100, lambda: self.poll_camera_start(waiter))
+            return
+        cap, self.waited_cap = self.waited_cap, None
+        self.start_button.config(state=tk.NORMAL)
+        self.recording_status.config(text="Not Recording", fg="#666666")
+        if self.recording or not self.record_frame.winfo_manager():
+            return  # the user has left the record screen meanwhile
+        self.begin_recording(cap)
+    
+    def begin_recording(self, cap):
+        # Start recording
+        self.recording = True
+        self.start_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL)
+        self.save_button.config(state=tk.NORMAL)
+        
+        # Update recording indicator
+        self.recording_indicator.itemconfig("indicator", fill=COLORS["error"])
+        self.recording_status.config(text="Recording...", fg=COLORS["error"])
+        self.blink_recording_indicator()
+        
+        self.cap = cap
+        if self.cap is None:
+            messagebox.showerror("Camera Error", "Could not find a working camera\nMake sure your webcam is connected and not in use by another application.")
+            self.stop_recording()
+            return
+        
+        # Create a new popup window for the camera display
+        self.create_camera_window()
             
-            # Update recording indicator
-            self.recording_indicator.itemconfig("indicator", fill=COLORS["error"])
-            self.recording_status.config(text="Recording...", fg=COLORS["error"])
-            self.blink_recording_indicator()
+        # Start capture thread
+        self.frames = []
+        self.frame_times = []
+        self.motion_gated = self.skip_still_var.get()
+        self.latest_frame = None
+        self.capture_thread = threading.Thread(target=self.capture_frames, name="capture")
+        self.capture_thread.daemon = True
+        self.capture_thread.start()
+    
+    def capture_frames(self):
+        """Read frames from the camera into self.frames until recording stops
+
+        When skipping still frames, only frames that moved are stored and
+        self.frame_times records when each was captured.
+        """
+        import cv2
+        
+        cap = self.cap
+        camera_fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        expected_interval = 1.0 / camera_fps if camera_fps > 1 else 1.0 / 20
+        start = time.perf_counter()
+        last = None
+        captured = 0
+        gated = self.motion_gated
+        kept_thumb = kept_time = held = None
+        
+        while self.recording:
+            with instrument.span("capture.read"):
+                ret, frame = cap.read()
+            if not ret:
+                instrument.count("capture.failed_reads")
+                time.sleep(0.01)
+                continue
             
-            # Setup camera with error handling
-            try:
-                # Try different camera indices if the default one fails
-                camera_found = False
-                for camera_index in range(3):  # Try indices 0, 1, 2
-                    print(f"Trying camera index {camera_index}")
-                    self.cap = cv2.VideoCapture(camera_index)
-                    if self.cap.isOpened():
-                        camera_found = True
-                        break
-                    self.cap.release()
-                
-                if not camera_found:
-                    raise Exception("Could not find a working camera")
-                    
-            except Exception as e:
-                messagebox.showerror("Camera Error", f"{str(e)}\nMake sure your webcam is connected and not in use by another application.")
-                self.stop_recording()
-                return
+            now = time.perf_counter()
+            if last is not None and now - last > 1.5 * expected_interval:
+                # Frames the camera should have delivered during the gap
+                instrument.count("capture.dropped_frames", int((now - last) / expected_interval) - 1)
+            last = now
+            self.latest_frame = frame
+            captured += 1
             
-            # Create a new popup window for the camera display
-            self.create_camera_window()
-                
-            # Start capture thread
-            self.frames = []
-            self.capture_thread = threading.Thread(target=self.capture_frames)
-            self.capture_thread.daemon = True
-            self.capture_thread.start()
+            if gated:
+                thumb = motion_thumbnail(frame)
+                if (kept_time is not None and now - kept_time < MAX_STILL_GAP
+                        and motion_score(kept_thumb, thumb) < MOTION_THRESHOLD):
+                    # Held back only so the recording keeps its full length if it ends here
+                    held = (frame, now)
+                    instrument.count("capture.skipped_still")
+                    continue
+                kept_thumb, kept_time, held = thumb, now, None
+                self.frame_times.append(now - start)
+            
+            self.frames.append(frame)
+        
+        if held is not None:
+            self.frame_times.append(held[1] - start)
+            self.frames.append(held[0])
+        
+        elapsed = time.perf_counter() - start
+        if elapsed > 0 and captured > 1:
+            # Encode at the rate frames actually arrived so playback runs at real speed
+            self.capture_fps = captured / elapsed
+            instrument.record("capture.fps", self.capture_fps, frames=captured)
     
     def blink_recording_indicator(self):
         """Create a blinking effect for the recording indicator"""
@@ -780,40 +1202,20 @@ class EmotionalJournalApp:
             
         if self.recording and self.cap and self.cap.isOpened():
             try:
-                ret, frame = self.cap.read()
-                if ret:
-                    # Convert to format Tkinter can display
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    img = PIL.Image.fromarray(frame)
-                    
-                    # Get the current size of the preview label
-                    width = self.preview_label.winfo_width()
-                    height = self.preview_label.winfo_height()
-                    
-                    # Use default size if widget not properly sized yet
-                    if width < 10:
-                        width = 640
-                        height = 480
-                    
-                    # Maintain aspect ratio
-                    img_ratio = frame.shape[1] / frame.shape[0]
-                    if width / height > img_ratio:
-                        new_width = int(height * img_ratio)
-                        new_height = height
-                    else:
-                        new_width = width
-                        new_height = int(width / img_ratio)
-                    
-                    # Resize the image
-                    img = img.resize((new_width, new_height), PIL.Image.LANCZOS)
-                    
-                    # Keep a reference to avoid garbage collection
-                    self.photo = PIL.ImageTk.PhotoImage(image=img)
-                    self.preview_label.config(image=self.photo)
-                    
-                    # Schedule the next update
-                    self.camera_window.after(30, self.update_preview)
-                    return
+                frame = self.latest_frame
+                if frame is not None:
+                    with instrument.span("preview.render"):
+                        img = frame_to_preview(frame, self.preview_label.winfo_width(),
+                                               self.preview_label.winfo_height())
+                        
+                        # Keep a reference to avoid garbage collection
+                        import PIL.ImageTk
+                        self.photo = PIL.ImageTk.PhotoImage(image=img)
+                        self.preview_label.config(image=self.photo)
+                
+                # Schedule the next update (the capture thread may not have a frame yet)
+                self.camera_window.after(30, self.update_preview)
+                return
             except Exception as e:
                 print(f"Camera preview error: {str(e)}")
         
@@ -824,9 +1226,13 @@ class EmotionalJournalApp:
     def stop_recording(self):
         self.recording = False
         
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        # Let the capture thread finish its current read before releasing the camera
+        if self.capture_thread is not None and self.capture_thread is not threading.current_thread():
+            self.capture_thread.join(timeout=2)
+            self.capture_thread = None
+        
+        # The camera manager keeps the device open for the next recording
+        self.cap = None
         
         # Close camera window if open
         if hasattr(self, 'camera_window') and self.camera_window.winfo_exists():
@@ -848,66 +1254,149 @@ class EmotionalJournalApp:
         
         print(f"Attempting to save {len(self.frames)} frames as video")
         
-        # Save the video with the title as the filename
-        video_filename = f"{self.title_entry.get().replace(' ', '_')}.mp4"
-        video_path = os.path.join(videos_dir, video_filename)
+        # Snapshot the form now; the save worker never touches Tk widgets
+        job = SaveJob(
+            self.title_entry.get(),
+            self.emotion_var.get(),
+            self.journal_text.get("1.0", tk.END),
+            self.frames,
+            fps=self.capture_fps,
+            profile=DEFAULT_STORAGE_PROFILE,
+            timestamps=self.frame_times if self.motion_gated else None
+        )
+        waiting = self.save_queue.pending
+        try:
+            self.save_queue.submit(job)
+        except queue.Full:
+            # The recording is kept, so it can be saved once an earlier save finishes
+            messagebox.showwarning("Saves Pending",
+                                   f"{waiting} journal entries are still being saved.\n"
+                                   "Please try again when one of them has finished.")
+            return
+        self.frames = []
+        self.frame_times = []
         
-        # Show saving progress
+        # Show saving progress (not modal: the app stays usable while encoding)
         progress_window = tk.Toplevel(self.root)
         progress_window.title("Saving...")
-        progress_window.geometry("300x100")
+        progress_window.geometry("340x160")
         progress_window.transient(self.root)
-        progress_window.grab_set()
+        progress_window.protocol("WM_DELETE_WINDOW", lambda: self.cancel_save(job, progress_label))
         
         progress_label = tk.Label(
             progress_window,
-            text=f"Saving your journal entry...\n({len(self.frames)} frames)",
+            text=f"Saving your journal entry...\n({job.total} frames)",
             font=("Helvetica", 12),
-            pady=20
+            pady=10
         )
         progress_label.pack()
         
-        # Start saving in a background thread
-        def save_in_background():
-            try:
-                # Save video and metadata
-                saved_path = save_video(self.frames, output_path=video_path)
-                
-                if saved_path and os.path.exists(saved_path):
-                    print(f"Video saved successfully to {saved_path}")
-                    # Save metadata
-                    metadata_file = os.path.join(videos_dir, f"{self.title_entry.get().replace(' ', '_')}.txt")
-                    with open(metadata_file, "w") as f:
-                        f.write(f"Title: {self.title_entry.get()}\n")
-                        f.write(f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                        f.write(f"Emotion: {self.emotion_var.get()}\n\n")
-                        f.write(self.journal_text.get("1.0", tk.END))
-                    
-                    # Update UI on the main thread
-                    self.root.after(0, lambda: self.save_complete(progress_window, saved_path))
-                else:
-                    print("Failed to save video: path not returned or file not created")
-                    # Update UI on the main thread
-                    self.root.after(0, lambda: self.save_failed(progress_window))
-            except Exception as e:
-                print(f"Error saving video: {str(e)}")
-                self.root.after(0, lambda: self.save_failed(progress_window, str(e)))
+        progress_bar = ttk.Progressbar(progress_window, maximum=max(job.total, 1), length=280)
+        progress_bar.pack(pady=(0, 10))
+        
+        cancel_button = ModernButton(
+            progress_window,
+            text="Cancel",
+            command=lambda: self.cancel_save(job, progress_label),
+            bg=COLORS["error"],
+            hover_color="#D32F2F"
+        )
+        cancel_button.pack()
+        
+        if waiting:
+            progress_label.config(text=f"Waiting for {waiting} earlier save(s)...")
+        self.poll_save_progress(job, progress_window, progress_label, progress_bar)
+    
+    def cancel_save(self, job, progress_label):
+        """Ask the save worker to stop; the poll loop closes the window"""
+        job.cancel.set()
+        progress_label.config(text="Cancelling...")
+    
+    def poll_save_progress(self, job, progress_window, progress_label, progress_bar):
+        """Show the encoder position, rate and ETA of a queued save until it finishes"""
+        if job.state == "done":
+            self.save_complete(progress_window, job.video_path)
+            return
+        if job.state == "failed":
+            self.save_failed(progress_window, job.error)
+            return
+        if job.state == "cancelled":
+            progress_window.destroy()
+            if not self.recording:
+                self.recording_status.config(text="Save cancelled", fg="#666666")
+            return
         
-        threading.Thread(target=save_in_background, daemon=True).start()
+        if job.cancel.is_set():
+            pass  # keep showing "Cancelling..." until the worker stops
+        elif job.state == "encoding":
+            text = f"Encoding frame {job.written} of {job.total}"
+            if job.eta is not None:
+                text += f"\n{job.encode_fps:.0f} frames/sec, about {job.eta:.0f}s left"
+            progress_label.config(text=text)
+            progress_bar.config(maximum=max(job.total, 1), value=job.written)
+        elif job.state == "committing":
+            progress_label.config(text="Writing journal entry...")
+            progress_bar.config(value=job.total)
+        
+        # Poll a few times a second; the worker only stores numbers, so this is the sole UI cost
+        self.root.after(250, lambda: self.poll_save_progress(job, progress_window, progress_label, progress_bar))
     
     def save_complete(self, progress_window, saved_path):
         """Handle successful video save."""
         progress_window.destroy()
+        if self.recording or self.frames or not self.record_frame.winfo_manager():
+            # A new recording is running (or waiting to be saved) or the user has moved
+            # on; don't interrupt either
+            title = os.path.basename(saved_path).replace(".mp4", "").replace("_", " ")
+            self.show_notice(f"Saved \"{title}\" - click to play",
+                             lambda: None if self.recording else self.show_playback_screen(saved_path))
+            return
+        
         # Update recording indicator
         self.recording_indicator.itemconfig("indicator", fill="#4CAF50")  # Green for success
         self.recording_status.config(text="Saved", fg=COLORS["success"])
-        # Reset after 2 seconds
-        self.root.after(2000, lambda: self.recording_status.config(text="Not Recording", fg="#666666"))
-        self.root.after(2000, lambda: self.recording_indicator.itemconfig("indicator", fill="#cccccc"))
+        # Reset after 2 seconds, unless a new recording has started by then
+        self.root.after(2000, self.reset_recording_status)
         
         messagebox.showinfo("Success", f"Journal entry saved successfully!\nPath: {saved_path}")
         self.show_playback_screen(saved_path)
     
+    def reset_recording_status(self):
+        if not self.recording:
+            self.recording_status.config(text="Not Recording", fg="#666666")
+            self.recording_indicator.itemconfig("indicator", fill="#cccccc")
+    
+    def show_notice(self, text, command=None):
+        """Show a short message at the bottom of the window without taking focus"""
+        if self.notice_label is None:
+            self.notice_label = tk.Label(
+                self.root,
+                font=("Helvetica", 10),
+                bg=COLORS["dark"],
+                fg="white",
+                padx=12,
+                pady=6,
+                cursor="hand2"
+            )
+        if self.notice_after_id is not None:
+            self.root.after_cancel(self.notice_after_id)
+        
+        def clicked(event):
+            self.hide_notice()
+            if command is not None:
+                command()
+        
+        self.notice_label.config(text=text)
+        self.notice_label.bind("<Button-1>", clicked)
+        self.notice_label.place(relx=0.5, rely=1.0, y=-10, anchor="s")
+        self.notice_label.lift()
+        self.notice_after_id = self.root.after(8000, self.hide_notice)
+    
+    def hide_notice(self):
+        self.notice_after_id = None
+        if self.notice_label is not None:
+            self.notice_label.place_forget()
+    
     def save_failed(self, progress_window, error_msg=""):
         """Handle failed video save."""
         progress_window.destroy()
@@ -918,14 +1407,47 @@ class EmotionalJournalApp:
     
     # Journal history functions
     def load_journal_entries(self):
+        with instrument.span("history.load"):
+            self._load_journal_entries()
+    
+    def schedule_search(self, event=None):
+        """Re-run the search shortly after the user stops typing"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(200, self.load_journal_entries)
+    
+    def clear_search(self):
+        self.search_var.set("")
+        self.emotion_filter.set(ALL_EMOTIONS)
+        self.date_from_var.set("")
+        self.date_to_var.set("")
+        self.load_journal_entries()
+    
+    def selected_emotion(self):
+        """Return the emotion chosen in the filter, or None for all emotions"""
+        # Dropdown items carry their match count, e.g. "Happy (3)"
+        emotion = self.emotion_filter.get().rsplit(" (", 1)[0]
+        return None if emotion == ALL_EMOTIONS else emotion
+    
+    def _date_filter(self, var):
+        """Return a YYYY-MM-DD filter value, or None if the field is empty or incomplete"""
+        value = var.get().strip()
+        try:
+            datetime.datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            return None
+        return value
+    
+    def _load_journal_entries(self):
+        self.search_after_id = None
+        
         # Clear existing entries
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
         
-        # Get list of video files
-        video_files = [f for f in os.listdir(videos_dir) if f.endswith('.mp4')]
-        
-        if not video_files:
+        if not self.search_index.docs:
+            self.emotion_filter.config(values=[ALL_EMOTIONS])
+            self.results_label.config(text="")
             empty_state = ModernFrame(self.scrollable_frame, bg=COLORS["light"], pady=40)
             empty_state.pack(fill=tk.X)
             
@@ -968,47 +1490,57 @@ class EmotionalJournalApp:
             
             return
         
-        # Sort files by date (newest first)
-        video_files.sort(reverse=True)
+        # Ranked by relevance when there is a query, otherwise newest first. The emotion
+        # filter is applied afterwards so the dropdown can count matches per emotion.
+        results = self.search_index.search(
+            self.search_var.get(),
+            date_from=self._date_filter(self.date_from_var),
+            date_to=self._date_filter(self.date_to_var),
+        )
+        counts = self.search_index.facet_counts(results)
+        emotion = self.selected_emotion()
+        self.emotion_filter.config(
+            values=[f"{ALL_EMOTIONS} ({len(results)})"]
+                   + [f"{e} ({counts.get(e, 0)})" for e in self.search_index.emotions()])
+        if emotion is None:
+            self.emotion_filter.set(f"{ALL_EMOTIONS} ({len(results)})")
+        else:
+            self.emotion_filter.set(f"{emotion} ({counts.get(emotion, 0)})")
+            results = [b for b in results if self.search_index.docs.get(b, {}).get("emotion") == emotion]
+        
+        if len(results) > MAX_HISTORY_RESULTS:
+            self.results_label.config(text=f"Showing {MAX_HISTORY_RESULTS} of {len(results)} entries")
+        else:
+            self.results_label.config(text=f"{len(results)} entries")
+        
+        if not results:
+            no_matches = tk.Label(
+                self.scrollable_frame,
+                text="No entries match your search",
+                font=("Helvetica", 12),
+                bg=COLORS["light"],
+                fg="#666666",
+                pady=20
+            )
+            no_matches.pack()
+            return
         
         # Display entries
-        for video_file in video_files:
-            self.add_entry_widget(video_file)
+        for file_base in results[:MAX_HISTORY_RESULTS]:
+            self.add_entry_widget(file_base)
+        self.canvas.yview_moveto(0)
     
-    def add_entry_widget(self, video_file):
-        video_path = os.path.join(videos_dir, video_file)
-        file_base = video_file.replace(".mp4", "")
-        
-        # Try to load metadata
-        metadata_file = os.path.join(videos_dir, f"{file_base}.txt")
-        if os.path.exists(metadata_file):
-            with open(metadata_file, "r") as f:
-                metadata = f.read()
-            
-            # Extract title and date if available
-            title = "Untitled Entry"
-            date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            emotion = "Not specified"
-            journal_content = ""
-            
-            for line in metadata.split("\n"):
-                if line.startswith("Title:"):
-                    title = line.replace("Title:", "").strip()
-                elif line.startswith("Date:"):
-                    date = line.replace("Date:", "").strip()
-                elif line.startswith("Emotion:"):
-                    emotion = line.replace("Emotion:", "").strip()
-            
-            # Get journal content
-            parts = metadata.split("\n\n", 1)
-            if len(parts) > 1:
-                journal_content = parts[1]
-        else:
-            # Fallback if no metadata
-            title = file_base
-            date = "Unknown date"
-            emotion = "Not specified"
-            journal_content = ""
+    def add_entry_widget(self, file_base):
+        video_path = os.path.join(videos_dir, f"{file_base}.mp4")
+        
+        # Card contents come from the search index, so no sidecar is read here
+        entry = self.search_index.docs.get(file_base)
+        if entry is None:
+            return  # removed by a background refresh
+        title = entry["title"]
+        date = entry["date"] or "Unknown date"
+        emotion = entry["emotion"]
+        preview = entry["preview"]
         
         # Create entry widget with modern card design
         entry_card = ModernFrame(
@@ -1025,15 +1557,7 @@ class EmotionalJournalApp:
         header_frame.pack(fill=tk.X)
         
         # Colored emotion indicator
-        emotion_color = COLORS["primary"]  # Default color
-        if emotion.lower() == "happy":
-            emotion_color = "#4CAF50"  # Green for happy
-        elif emotion.lower() == "sad":
-            emotion_color = "#2196F3"  # Blue for sad
-        elif emotion.lower() == "anxious":
-            emotion_color = "#FF9800"  # Orange for anxious
-        elif emotion.lower() == "angry":
-            emotion_color = "#F44336"  # Red for angry
+        emotion_color = EMOTION_COLORS.get(emotion.lower(), COLORS["primary"])
         
         emotion_indicator = tk.Frame(header_frame, bg=emotion_color, width=4, height=24)
         emotion_indicator.pack(side=tk.LEFT, padx=(0, 15))
@@ -1076,9 +1600,7 @@ class EmotionalJournalApp:
         content_frame.pack(fill=tk.X, pady=10)
         
         # Content preview (if available)
-        if journal_content:
-            # Limit to 150 chars
-            preview = journal_content[:150] + ("..." if len(journal_content) > 150 else "")
+        if preview:
             content_label = tk.Label(
                 content_frame, 
                 text=preview,
@@ -1103,6 +1625,39 @@ class EmotionalJournalApp:
             hover_color=COLORS["secondary"]
         )
         play_button.pack(side=tk.RIGHT)
+        
+        delete_button = ModernButton(
+            button_frame,
+            text="Delete",
+            command=lambda base=file_base: self.delete_entry(base),
+            bg=COLORS["light_accent"],
+            fg=COLORS["error"],
+            hover_color=COLORS["border"]
+        )
+        delete_button.pack(side=tk.RIGHT, padx=(0, 10))
+    
+    def delete_entry(self, file_base):
+        """Delete an entry's video and sidecar and drop it from the index and rollups"""
+        entry = self.search_index.docs.get(file_base, {})
+        title = entry.get("title", file_base)
+        if not messagebox.askyesno("Delete Entry", f"Delete \"{title}\"?\nThis cannot be undone."):
+            return
+        
+        try:
+            # The video goes first: once it is gone the entry no longer appears in the history
+            for extension in (".mp4", ".txt"):
+                path = os.path.join(videos_dir, f"{file_base}{extension}")
+                if os.path.exists(path):
+                    os.remove(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not delete the entry.\nReason: {str(e)}")
+            return
+        
+        self.search_index.remove(file_base)
+        self.search_index.save()
+        self.rollups.remove(file_base)
+        self.rollups.save()
+        self.load_journal_entries()
 
 def main():
     try:
@@ -1115,6 +1670,19 @@ def main():
         
         root = tk.Tk()
         app = EmotionalJournalApp(root)
+        
+        def on_first_map(event):
+            if event.widget is not root:
+                return
+            root.unbind("<Map>")
+            elapsed_ms = (time.perf_counter() - _START_TIME) * 1000
+            instrument.record("startup.first_window_ms", elapsed_ms)
+            print(f"first_window_ms={elapsed_ms:.1f}", flush=True)
+            if os.environ.get("EJ_STARTUP_BENCH"):
+                # Used by bench/bench_startup.py: exit as soon as the window is up
+                root.after(0, root.destroy)
+        
+        root.bind("<Map>", on_first_map)
         root.mainloop()
         
     except Exception as e:
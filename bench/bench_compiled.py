@@ -0,0 +1,59 @@
+import time
+import numpy as np
+
+def _time_calls(fn, iterations):
+    """Return (first call ms, mean ms of the following calls)."""
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return first * 1000, (time.perf_counter() - start) * 1000 / iterations
+
+def run(batch_sizes=(1, 64), iterations=50, train_steps=20, train_batch=32):
+    """Compare default Keras execution with graph and XLA-compiled predict/train steps.
+
+    first_call_ms includes tracing/compilation; step_ms is the steady state.
+    """
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return {"skipped": "tensorflow not installed"}
+    from model import build_model
+    from compiled import CompiledPredictor
+
+    rng = np.random.default_rng(0)
+    results = {"predict": {}, "train": {}}
+
+    for batch_size in batch_sizes:
+        images = rng.random((batch_size, 48, 48, 3), dtype=np.float32)
+        model = build_model()
+        modes = {
+            "keras": model,
+            "graph": CompiledPredictor(model, batch_size, jit_compile=False),
+            "xla": CompiledPredictor(model, batch_size, jit_compile=True),
+        }
+        for mode, predictor in modes.items():
+            try:
+                first, step = _time_calls(lambda: predictor.predict_on_batch(images), iterations)
+            except Exception as e:  # XLA is not available in every CPU build
+                results["predict"][f"{mode}_{batch_size}"] = {"error": str(e)}
+                continue
+            results["predict"][f"{mode}_{batch_size}"] = {
+                "first_call_ms": first,
+                "step_ms": step,
+                "images_per_sec": batch_size * 1000 / step,
+            }
+
+    images = rng.random((train_batch, 48, 48, 3), dtype=np.float32)
+    labels = tf.keras.utils.to_categorical(rng.integers(0, 7, train_batch), 7)
+    for mode, jit_compile in (("keras", False), ("xla", True)):
+        model = build_model(jit_compile=jit_compile)
+        try:
+            first, step = _time_calls(lambda: model.train_on_batch(images, labels), train_steps)
+        except Exception as e:
+            results["train"][mode] = {"error": str(e)}
+            continue
+        results["train"][mode] = {"first_call_ms": first, "step_ms": step}
+    return results
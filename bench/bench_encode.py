@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+from bench.common import synthetic_frames, best_of
+
+CODECS = ['mp4v', 'X264', 'DIVX', 'XVID', 'MJPG', 'avc1']
+
+def encode_frames(frames, path, codec, fps=20):
+    """Encode frames with cv2.VideoWriter, returning False if the codec is unavailable."""
+    import cv2
+    height, width = frames[0].shape[:2]
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+    if not out.isOpened():
+        return False
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return True
+
+def encode_ffmpeg(frames, path, preset, fps=20, threads=0):
+    """Encode frames through the ffmpeg pipe backend."""
+    from encoders import FFmpegWriter
+    height, width = frames[0].shape[:2]
+    out = FFmpegWriter(path, fps, (width, height), preset=preset, threads=threads)
+    if not out.isOpened():
+        return False
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return True
+
+def run(num_frames=120, width=640, height=480, repeat=3):
+    """Measure encode fps and output size per codec and ffmpeg preset, plus save_video end to end."""
+    from utils import save_video
+    from encoders import FFMPEG_PRESETS, ffmpeg_codec
+    frames = synthetic_frames(num_frames, width, height)
+    results = {"frames": num_frames, "resolution": [width, height], "codecs": {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec in CODECS:
+            path = os.path.join(tmp, f"bench_{codec}.mp4")
+            seconds, ok = best_of(lambda: encode_frames(frames, path, codec), repeat)
+            if not ok or not os.path.exists(path):
+                results["codecs"][codec] = {"available": False}
+                continue
+            results["codecs"][codec] = {
+                "available": True,
+                "fps": num_frames / seconds,
+                "ms_per_frame": seconds * 1000 / num_frames,
+                "bytes": os.path.getsize(path),
+            }
+
+        codec = ffmpeg_codec()
+        results["ffmpeg"] = {"codec": codec, "presets": {}}
+        if codec:
+            for preset in FFMPEG_PRESETS:
+                path = os.path.join(tmp, f"bench_ffmpeg_{preset}.mp4")
+                seconds, ok = best_of(lambda: encode_ffmpeg(frames, path, preset), repeat)
+                if ok and os.path.exists(path):
+                    results["ffmpeg"]["presets"][preset] = {
+                        "fps": num_frames / seconds,
+                        "ms_per_frame": seconds * 1000 / num_frames,
+                        "bytes": os.path.getsize(path),
+                    }
+
+        path = os.path.join(tmp, "bench_save_video.mp4")
+        start = time.perf_counter()
+        saved = save_video(frames, output_path=path)
+        seconds = time.perf_counter() - start
+        results["save_video"] = {
+            "fps": num_frames / seconds,
+            "seconds": seconds,
+            "bytes": os.path.getsize(saved) if saved and os.path.exists(saved) else 0,
+        }
+    return results
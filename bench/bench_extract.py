@@ -0,0 +1,28 @@
+import os
+import tempfile
+from bench.common import synthetic_frames, make_test_video, best_of
+
+def run(num_frames=200, width=640, height=480, fps=20, interval=0.5, repeat=3):
+    """Measure extract.py throughput on a generated test video."""
+    from extract import extract_frames
+    frames = synthetic_frames(num_frames, width, height)
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = make_test_video(os.path.join(tmp, "bench.mp4"), frames, fps=fps)
+        output = os.path.join(tmp, "frames")
+        seconds, written = best_of(
+            lambda: extract_frames(video_path, output, interval=interval, show=False), repeat)
+        adaptive_seconds, adaptive_written = best_of(
+            lambda: extract_frames(video_path, output, show=False, mode="adaptive"), repeat)
+    return {
+        "frames": num_frames,
+        "resolution": [width, height],
+        "interval": interval,
+        "frames_written": written,
+        "seconds": seconds,
+        "decode_fps": num_frames / seconds,
+        "adaptive": {
+            "frames_written": adaptive_written,
+            "seconds": adaptive_seconds,
+            "decode_fps": num_frames / adaptive_seconds,
+        },
+    }
@@ -0,0 +1,70 @@
+import datetime
+import os
+import tempfile
+import time
+
+EMOTIONS = ["Happy", "Sad", "Anxious", "Calm", "Angry", "Grateful", "Confused", "Other"]
+
+BODY = "Today I thought about work, family and the weather. " * 4 + "\n"
+
+def write_entries(directory, count, legacy=False):
+    """Create `count` sidecar files (and empty videos) like the app saves them.
+
+    legacy=True writes the original Title:/Date:/Emotion: text format.
+    """
+    from utils import format_metadata
+    start = datetime.datetime(2025, 1, 1)
+    for i in range(count):
+        base = f"entry_{i:06d}"
+        date = (start + datetime.timedelta(hours=i)).strftime('%Y-%m-%d %H:%M:%S')
+        emotion = EMOTIONS[i % len(EMOTIONS)]
+        if legacy:
+            with open(os.path.join(directory, f"{base}.txt"), "w") as f:
+                f.write(f"Title: Entry {i}\n")
+                f.write(f"Date: {date}\n")
+                f.write(f"Emotion: {emotion}\n\n")
+                f.write(BODY)
+        else:
+            with open(os.path.join(directory, f"{base}.txt"), "wb") as f:
+                f.write(format_metadata(f"Entry {i}", date, emotion, BODY))
+        open(os.path.join(directory, f"{base}.mp4"), "wb").close()
+
+def load_entries(directory, body=True):
+    """List and parse every entry's sidecar."""
+    from utils import read_metadata
+    video_files = [f for f in os.listdir(directory) if f.endswith('.mp4')]
+    video_files.sort(reverse=True)
+    entries = []
+    for video_file in video_files:
+        metadata_file = os.path.join(directory, video_file.replace(".mp4", ".txt"))
+        if os.path.exists(metadata_file):
+            entries.append(read_metadata(metadata_file, body=body))
+    return entries
+
+def _time_load(count, legacy, body):
+    with tempfile.TemporaryDirectory() as tmp:
+        write_entries(tmp, count, legacy=legacy)
+        start = time.perf_counter()
+        entries = load_entries(tmp, body=body)
+        return len(entries), time.perf_counter() - start
+
+def run(counts=(100, 1000, 5000)):
+    """Measure sidecar loading (listdir + parsing) at several entry counts.
+
+    load_ms is a header-only read of current-format sidecars (what list views
+    do); full_load_ms also reads the journal text, and legacy_load_ms parses
+    the original text format.
+    """
+    results = {}
+    for count in counts:
+        entries, seconds = _time_load(count, legacy=False, body=False)
+        _, full_seconds = _time_load(count, legacy=False, body=True)
+        _, legacy_seconds = _time_load(count, legacy=True, body=True)
+        results[str(count)] = {
+            "entries": entries,
+            "load_ms": seconds * 1000,
+            "us_per_entry": seconds * 1e6 / count,
+            "full_load_ms": full_seconds * 1000,
+            "legacy_load_ms": legacy_seconds * 1000,
+        }
+    return results
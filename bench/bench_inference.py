@@ -0,0 +1,45 @@
+import time
+import numpy as np
+
+def _measure(model, channels, batch_sizes, iterations, train_steps):
+    import tensorflow as tf
+
+    rng = np.random.default_rng(0)
+    results = {"inference": {}, "params": int(model.count_params())}
+
+    for batch_size in batch_sizes:
+        images = rng.random((batch_size, 48, 48, channels), dtype=np.float32)
+        model.predict_on_batch(images)  # warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            model.predict_on_batch(images)
+        seconds = time.perf_counter() - start
+        results["inference"][str(batch_size)] = {
+            "ms_per_batch": seconds * 1000 / iterations,
+            "images_per_sec": batch_size * iterations / seconds,
+        }
+
+    images = rng.random((32, 48, 48, channels), dtype=np.float32)
+    labels = tf.keras.utils.to_categorical(rng.integers(0, 7, 32), 7)
+    model.train_on_batch(images, labels)  # warm-up
+    start = time.perf_counter()
+    for _ in range(train_steps):
+        model.train_on_batch(images, labels)
+    results["train_step_ms"] = (time.perf_counter() - start) * 1000 / train_steps
+    return results
+
+def run(batch_sizes=(1, 32, 128), iterations=20, train_steps=10):
+    """Measure inference images/sec and training step time for the emotion CNN.
+
+    The RGB model's numbers are at the top level; the grayscale variant's are
+    under "grayscale".
+    """
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return {"skipped": "tensorflow not installed"}
+    from model import build_model
+
+    results = _measure(build_model(), 3, batch_sizes, iterations, train_steps)
+    results["grayscale"] = _measure(build_model(channels=1), 1, batch_sizes, iterations, train_steps)
+    return results
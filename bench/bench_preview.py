@@ -0,0 +1,35 @@
+import os
+import time
+from bench.common import synthetic_frames
+
+def run(num_frames=100, width=1280, height=720, label_size=(760, 480)):
+    """Measure per-frame preview conversion cost, and Tk PhotoImage cost when a display exists."""
+    from utils import frame_to_preview
+    frames = synthetic_frames(num_frames, width, height)
+
+    start = time.perf_counter()
+    images = [frame_to_preview(frame, *label_size) for frame in frames]
+    convert_seconds = time.perf_counter() - start
+    results = {
+        "frames": num_frames,
+        "resolution": [width, height],
+        "label_size": list(label_size),
+        "convert_ms_per_frame": convert_seconds * 1000 / num_frames,
+    }
+
+    if not os.environ.get("DISPLAY") and os.name != "nt":
+        results["photoimage_ms_per_frame"] = None
+        return results
+
+    import tkinter as tk
+    import PIL.ImageTk
+    root = tk.Tk()
+    root.withdraw()
+    try:
+        start = time.perf_counter()
+        for img in images:
+            PIL.ImageTk.PhotoImage(image=img)
+        results["photoimage_ms_per_frame"] = (time.perf_counter() - start) * 1000 / num_frames
+    finally:
+        root.destroy()
+    return results
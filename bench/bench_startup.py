@@ -0,0 +1,42 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from bench.common import ROOT
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+def run(repeat=5):
+    """Measure app module import time and, with a display, time to first window."""
+    import_ms = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        import_ms.append(float(out.stdout.strip().splitlines()[-1]))
+    results = {"import_ms": statistics.median(import_ms)}
+
+    if not os.environ.get("DISPLAY") and os.name != "nt":
+        results["first_window_ms"] = None
+        results["process_to_window_ms"] = None
+        return results
+
+    env = dict(os.environ, EJ_STARTUP_BENCH="1")
+    window_ms = []
+    wall_ms = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "app.py"], cwd=ROOT, env=env,
+                             capture_output=True, text=True, timeout=60)
+        wall = (time.perf_counter() - start) * 1000
+        for line in out.stdout.splitlines():
+            if line.startswith("first_window_ms="):
+                window_ms.append(float(line.split("=", 1)[1]))
+                wall_ms.append(wall)
+    results["first_window_ms"] = statistics.median(window_ms) if window_ms else None
+    # Includes interpreter start-up and teardown, so an upper bound on what the user sees
+    results["process_to_window_ms"] = statistics.median(wall_ms) if wall_ms else None
+    return results
@@ -0,0 +1,82 @@
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+# Make the project modules importable when running `python bench/run.py`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    """Generate BGR frames with a moving gradient, a moving block and sensor noise."""
+    rng = np.random.default_rng(seed)
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)
+    base = (xs[np.newaxis, :] * 0.5 + ys[:, np.newaxis] * 0.5)
+    frames = []
+    for i in range(count):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        shifted = np.roll(base, i * 2, axis=1)
+        frame[..., 0] = shifted.astype(np.uint8)
+        frame[..., 1] = (255 - shifted).astype(np.uint8)
+        frame[..., 2] = 128
+        # A block that moves across the frame, standing in for a face
+        x = (i * 8) % max(1, width - 120)
+        frame[height // 3:height // 3 + 120, x:x + 120] = (40, 80, 200)
+        noise = rng.integers(0, 8, size=(height, width, 1), dtype=np.uint8)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames
+
+def make_test_video(path, frames, fps=20, codec="mp4v"):
+    """Write frames to a video file for decode benchmarks and return its path."""
+    import cv2
+    height, width = frames[0].shape[:2]
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+    if not out.isOpened():
+        raise RuntimeError(f"Could not open VideoWriter with codec {codec}")
+    for frame in frames:
+        out.write(frame)
+    out.release()
+    return path
+
+def best_of(fn, repeat=3):
+    """Run fn `repeat` times and return (best seconds, last return value)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def environment():
+    """Describe the machine and library versions the results were taken on."""
+    info = {
+        "created": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    try:
+        import cv2
+        info["opencv"] = cv2.__version__
+    except ImportError:
+        pass
+    return info
+
+def save_results(results, path=None):
+    """Write benchmark results as JSON and return the path written."""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"bench_{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
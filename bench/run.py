@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.common import environment, save_results
+from bench import (bench_encode, bench_extract, bench_preview, bench_history, bench_inference,
+                   bench_compiled, bench_startup)
+
+# Name -> (module, keyword arguments for a full run, keyword arguments for --quick)
+SUITES = {
+    "encode": (bench_encode, {}, {"num_frames": 30, "repeat": 1}),
+    "extract": (bench_extract, {}, {"num_frames": 40, "repeat": 1}),
+    "preview": (bench_preview, {}, {"num_frames": 20}),
+    "history": (bench_history, {}, {"counts": (100, 1000)}),
+    "inference": (bench_inference, {}, {"iterations": 3, "train_steps": 2}),
+    "compiled": (bench_compiled, {}, {"iterations": 3, "train_steps": 2}),
+    "startup": (bench_startup, {}, {"repeat": 1}),
+}
+
+def flatten(results, prefix=""):
+    """Flatten nested result dicts into {'a.b.c': number}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(baseline_path, results):
+    """Print every numeric metric next to its baseline value and the ratio."""
+    with open(baseline_path, "r") as f:
+        baseline = flatten(json.load(f).get("results", {}))
+    current = flatten(results["results"])
+    print(f"\n{'metric':60} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for name in sorted(current):
+        if name in baseline:
+            old, new = baseline[name], current[name]
+            ratio = new / old if old else float("inf")
+            print(f"{name:60} {old:12.3f} {new:12.3f} {ratio:8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run headless benchmarks for the Emotional Journal hot paths')
+    parser.add_argument('--only', nargs='+', choices=sorted(SUITES), help='Run only these suites')
+    parser.add_argument('--quick', action='store_true', help='Use small inputs for a fast smoke run')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Where to write the JSON results (default: bench/results/bench_<timestamp>.json)')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline results JSON to compare against')
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "results": {}}
+    for name in args.only or SUITES:
+        module, full_kwargs, quick_kwargs = SUITES[name]
+        print(f"Running {name} benchmark...")
+        try:
+            results["results"][name] = module.run(**(quick_kwargs if args.quick else full_kwargs))
+        except Exception as e:
+            traceback.print_exc()
+            results["results"][name] = {"error": str(e)}
+
+    path = save_results(results, args.output)
+    print(json.dumps(results["results"], indent=2))
+    print(f"Results written to {path}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from faces import FaceDetector, iter_video_faces, FACE_SIZE
+from labels import model_classes, labeled_entries
+from utils import ensure_dir
+
+videos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
+output_dir = "dataset/shards"
+
+# Faces per shard file
+SHARD_SIZE = 5000
+
+def faces_from_video(video_path, interval, channels, align):
+    """Detect, align and crop faces from one video; returns a (N, 48, 48[, 3]) uint8 array."""
+    detector = FaceDetector(align=align)
+    crops = [face for _, face in iter_video_faces(video_path, detector, interval, FACE_SIZE, channels)]
+    if not crops:
+        return np.zeros((0, FACE_SIZE, FACE_SIZE) + ((3,) if channels == 3 else ()), dtype=np.uint8)
+    images = np.stack(crops)
+    # Grayscale shards store (N, 48, 48); test.py adds the channel axis when loading
+    return images[..., 0] if channels == 1 else images
+
+class ShardWriter:
+    """Buffers face crops and writes them out as fixed-size .npz shards.
+
+    The shard format (images, labels, classes) is what test.py --shard reads.
+    """
+
+    def __init__(self, directory, classes, shard_size=SHARD_SIZE, next_index=0):
+        self.directory = directory
+        self.classes = np.array(classes)
+        self.shard_size = shard_size
+        self.next_index = next_index
+        self.images = []
+        self.labels = []
+        self.buffered = 0
+
+    @property
+    def current_shard(self):
+        return f"shard_{self.next_index:05d}.npz"
+
+    def add(self, images, label):
+        self.images.append(images)
+        self.labels.append(np.full(len(images), label, dtype=np.int64))
+        self.buffered += len(images)
+        if self.buffered >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        path = os.path.join(self.directory, self.current_shard)
+        tmp_path = path[:-len(".npz")] + ".tmp.npz"
+        np.savez(tmp_path, images=np.concatenate(self.images), labels=np.concatenate(self.labels),
+                 classes=self.classes)
+        os.replace(tmp_path, path)
+        print(f"Wrote {self.buffered} faces to {path}")
+        self.images, self.labels, self.buffered = [], [], 0
+        self.next_index += 1
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"videos": {}, "next_shard": 0}
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Turn labelled journal videos into packed 48x48 face-crop shards')
+    parser.add_argument('--videos', type=str, default=videos_dir, help='Journal videos directory')
+    parser.add_argument('--output-dir', type=str, default=output_dir, help='Where to write the shards')
+    parser.add_argument('--classes-dir', type=str, default="dataset/train",
+                        help='Training directory whose subfolders name the model classes')
+    parser.add_argument('--interval', type=float, default=0.5, help='Seconds between sampled frames (default: 0.5)')
+    parser.add_argument('--channels', type=int, choices=[1, 3], default=1,
+                        help='Store grayscale (1) or RGB (3) crops (default: 1)')
+    parser.add_argument('--no-align', action='store_true', help='Skip eye-based rotation alignment')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='Faces per shard file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Videos processed in parallel (default: number of CPU cores)')
+    parser.add_argument('--rebuild', action='store_true', help='Discard existing shards and process every video')
+    args = parser.parse_args()
+
+    ensure_dir(args.output_dir)
+    manifest_path = os.path.join(args.output_dir, "manifest.json")
+    manifest = {"videos": {}, "next_shard": 0} if args.rebuild else load_manifest(manifest_path)
+    if args.rebuild:
+        for name in os.listdir(args.output_dir):
+            if name.startswith("shard_") and name.endswith(".npz"):
+                os.remove(os.path.join(args.output_dir, name))
+
+    classes = model_classes(args.classes_dir)
+    pending = []
+    for base, video_path, label in labeled_entries(args.videos, classes):
+        stat = os.stat(video_path)
+        known = manifest["videos"].get(base)
+        if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size:
+            continue
+        if known:
+            # Its old crops are still in their shard; packing it again would duplicate them
+            print(f"Skipping {base}: changed since it was packed into {known['shard']}; "
+                  f"use --rebuild to repack it")
+            continue
+        pending.append((base, video_path, label, stat))
+    print(f"{len(pending)} videos to process with {args.workers} workers")
+
+    start = time.perf_counter()
+    writer = ShardWriter(args.output_dir, classes, args.shard_size, manifest["next_shard"])
+    manifest["classes"] = classes
+    unflushed = {}  # videos whose crops are still buffered in the writer
+    total = 0
+
+    def commit():
+        # Only videos whose crops are on disk go into the manifest, so a crash
+        # costs at most the shard being filled
+        manifest["videos"].update(unflushed)
+        unflushed.clear()
+        manifest["next_shard"] = writer.next_index
+        save_manifest(manifest_path, manifest)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(faces_from_video, video_path, args.interval, args.channels, not args.no_align):
+                   (base, label, stat) for base, video_path, label, stat in pending}
+        for future in as_completed(futures):
+            base, label, stat = futures[future]
+            try:
+                images = future.result()
+            except Exception as e:
+                print(f"{base}: {str(e)}")
+                continue
+            shard = writer.current_shard
+            writer.add(images, label)
+            total += len(images)
+            unflushed[base] = {"mtime": stat.st_mtime, "size": stat.st_size,
+                               "faces": len(images), "label": classes[label], "shard": shard}
+            print(f"{base}: {len(images)} faces ({classes[label]})")
+            if not writer.buffered:
+                commit()
+    writer.flush()
+    commit()
+    print(f"Packed {total} faces from {len(pending)} videos in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
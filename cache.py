@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+from utils import ensure_dir
+
+# Default location for on-disk prediction caches
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "predictions")
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PredictionCache:
+    """On-disk LRU cache of class-probability vectors.
+
+    Entries are keyed by (model file hash, preprocessing version, image
+    content hash). Probabilities live in a fixed-size ``probs.npy`` array
+    that is memory-mapped so only touched rows are written; ``index.json``
+    maps keys to array slots and their last-use tick.
+    """
+
+    def __init__(self, model_path, preprocess_version, num_classes,
+                 cache_dir=CACHE_DIR, max_entries=50000):
+        self.cache_dir = cache_dir
+        self.num_classes = num_classes
+        self.max_entries = max_entries
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.array_path = os.path.join(cache_dir, "probs.npy")
+        self.prefix = f"{file_hash(model_path)}:{preprocess_version}:"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        ensure_dir(cache_dir)
+        self._load()
+
+    def _load(self):
+        self.slots = {}
+        self.ticks = {}
+        self.tick = 0
+        probs = None
+        if os.path.exists(self.index_path) and os.path.exists(self.array_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    index = json.load(f)
+                probs = np.lib.format.open_memmap(self.array_path, mode="r+")
+                if probs.shape != (self.max_entries, self.num_classes):
+                    # Shape changed (new cap or class count): start fresh
+                    probs = None
+                else:
+                    self.tick = index.get("tick", 0)
+                    for key, (slot, tick) in index.get("entries", {}).items():
+                        self.slots[key] = slot
+                        self.ticks[key] = tick
+            except (OSError, ValueError) as e:
+                print(f"Prediction cache unreadable, rebuilding: {str(e)}")
+                probs = None
+                self.slots = {}
+                self.ticks = {}
+
+        if probs is None:
+            probs = np.lib.format.open_memmap(
+                self.array_path, mode="w+", dtype=np.float32,
+                shape=(self.max_entries, self.num_classes)
+            )
+        self.probs = probs
+        used = set(self.slots.values())
+        self.free = [s for s in range(self.max_entries - 1, -1, -1) if s not in used]
+
+    def key(self, image_hash):
+        """Build the full cache key for an image content hash."""
+        return self.prefix + image_hash
+
+    def get(self, image_hash):
+        """Return the cached probability vector for an image hash, or None."""
+        key = self.key(image_hash)
+        with self._lock:
+            slot = self.slots.get(key)
+            if slot is None:
+                self.misses += 1
+                return None
+            self.tick += 1
+            self.ticks[key] = self.tick
+            self._dirty = True
+            self.hits += 1
+            return np.array(self.probs[slot])
+
+    def put(self, image_hash, probs):
+        """Store a probability vector, evicting least recently used entries if full."""
+        key = self.key(image_hash)
+        with self._lock:
+            slot = self.slots.get(key)
+            if slot is None:
+                if not self.free:
+                    self._evict(max(1, self.max_entries // 10))
+                slot = self.free.pop()
+                self.slots[key] = slot
+            self.probs[slot] = probs
+            self.tick += 1
+            self.ticks[key] = self.tick
+            self._dirty = True
+
+    def _evict(self, count):
+        # Evict a batch at once so the O(n) scan is amortised over many puts
+        oldest = sorted(self.ticks, key=self.ticks.get)[:count]
+        for key in oldest:
+            self.free.append(self.slots.pop(key))
+            del self.ticks[key]
+
+    def flush(self):
+        """Persist the index and any modified array rows."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.probs.flush()
+            index = {
+                "tick": self.tick,
+                "entries": {k: [self.slots[k], self.ticks[k]] for k in self.slots},
+            }
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -0,0 +1,285 @@
+import json
+import os
+import threading
+import time
+import instrument
+from utils import ensure_dir
+
+# Discovery results are remembered between runs so start-up does not re-probe every index
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "camera.json")
+
+# Camera indices tried during discovery
+PROBE_INDICES = (0, 1, 2)
+
+# Modes checked once per device; the achieved values are what the driver reports back
+PROBE_RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+PROBE_FOURCCS = ["MJPG", "YUYV"]
+
+# Capture formats the recorder can ask for. MJPEG keeps USB bandwidth low enough for
+# 720p30 on most UVC webcams, where uncompressed YUYV is often capped at 5-10 fps.
+# Recordings are buffered as raw frames until saved, so "hd" costs about 4.5x the
+# memory per second of "vga" (2.7 MB per frame); it is opt-in.
+CAPTURE_TARGETS = {
+    "vga": {"fourcc": "MJPG", "width": 640, "height": 480, "fps": 20},
+    "hd": {"fourcc": "MJPG", "width": 1280, "height": 720, "fps": 30},
+}
+DEFAULT_CAPTURE_TARGET = "vga"
+CAPTURE_TARGET = CAPTURE_TARGETS[DEFAULT_CAPTURE_TARGET]
+
+# Set EJ_CAPTURE to the name of a capture target to record with it instead of the default
+CAPTURE_ENV = "EJ_CAPTURE"
+
+# Accept the negotiated mode if the measured rate reaches this fraction of the target
+MIN_FPS_RATIO = 0.8
+
+def capture_target(name=None):
+    """Return the capture target called name, or the one named by $EJ_CAPTURE, or the default."""
+    name = name or os.environ.get(CAPTURE_ENV) or DEFAULT_CAPTURE_TARGET
+    if name not in CAPTURE_TARGETS:
+        print(f"Unknown capture target {name!r}, using {DEFAULT_CAPTURE_TARGET!r}")
+        name = DEFAULT_CAPTURE_TARGET
+    return CAPTURE_TARGETS[name]
+
+def fourcc_to_str(value):
+    """Convert a CAP_PROP_FOURCC value into its four-character code."""
+    value = int(value)
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+def probe_modes(cap):
+    """Return the distinct (fourcc, width, height, fps) modes a device accepts."""
+    import cv2
+
+    modes = []
+    for fourcc in PROBE_FOURCCS:
+        for width, height in PROBE_RESOLUTIONS:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            mode = {
+                "fourcc": fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "fps": float(cap.get(cv2.CAP_PROP_FPS)),
+            }
+            if mode not in modes:
+                modes.append(mode)
+    return modes
+
+def choose_mode(modes, target=CAPTURE_TARGET):
+    """Pick the probed mode closest to the target, preferring the target FOURCC."""
+    if not modes:
+        return dict(target)
+
+    def score(mode):
+        # Resolutions above the target cost bandwidth for nothing; below it lose detail
+        pixels = mode["width"] * mode["height"]
+        target_pixels = target["width"] * target["height"]
+        oversize = pixels > target_pixels
+        return (
+            mode["fourcc"] != target["fourcc"],
+            mode["fps"] and mode["fps"] < target["fps"],
+            oversize,
+            abs(pixels - target_pixels),
+        )
+
+    mode = dict(min(modes, key=score))
+    mode["fps"] = target["fps"]
+    return mode
+
+def apply_mode(cap, mode):
+    """Request a capture mode and return what the driver reports back."""
+    import cv2
+
+    # FOURCC must be set before the size for V4L2 to pick the compressed format
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode["fourcc"]))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode["width"])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode["height"])
+    cap.set(cv2.CAP_PROP_FPS, mode["fps"])
+    return {
+        "fourcc": fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": float(cap.get(cv2.CAP_PROP_FPS)),
+    }
+
+def measure_fps(cap, frames=15):
+    """Time consecutive reads to find the rate the device actually delivers."""
+    cap.read()  # the first read after a mode change includes stream start-up
+    start = time.perf_counter()
+    delivered = 0
+    for _ in range(frames):
+        ret, _ = cap.read()
+        if ret:
+            delivered += 1
+    elapsed = time.perf_counter() - start
+    return delivered / elapsed if elapsed > 0 else 0.0
+
+def negotiate(cap, modes, target=CAPTURE_TARGET):
+    """Apply the best capture mode for the target and verify the achieved frame rate.
+
+    If the preferred format cannot reach MIN_FPS_RATIO of the target rate, the
+    other probed formats are tried and the fastest result is kept.
+    """
+    preferred = choose_mode(modes, target)
+    fallbacks = [choose_mode(modes, dict(target, fourcc=f)) for f in PROBE_FOURCCS
+                 if f != preferred["fourcc"]]
+
+    best = None
+    for mode in [preferred] + fallbacks:
+        reported = apply_mode(cap, mode)
+        measured = measure_fps(cap)
+        result = {"requested": mode, "reported": reported, "measured_fps": measured}
+        print(f"Camera mode {reported['fourcc']} {reported['width']}x{reported['height']} "
+              f"@ {measured:.1f} fps (requested {mode['fps']})")
+        if best is None or measured > best["measured_fps"]:
+            best = result
+        if measured >= target["fps"] * MIN_FPS_RATIO:
+            break
+
+    if best["requested"] is not mode:
+        apply_mode(cap, best["requested"])
+    instrument.record("camera.negotiated_fps", best["measured_fps"], **best["reported"])
+    return best
+
+class CameraManager:
+    """Finds the working camera once and keeps it open while it may be needed.
+
+    Discovery runs in the background and its result (device index and
+    supported modes) is cached on disk. While the record screen is visible
+    the device is kept open, so starting a recording does not pay the
+    open/probe cost.
+    """
+
+    def __init__(self, cache_path=CACHE_PATH, target=None):
+        self.cache_path = cache_path
+        self.target = target or capture_target()
+        self.index = None
+        self.modes = []
+        self.negotiated = None
+        self.cap = None
+        self.keep_warm = False
+        self.lock = threading.RLock()
+        self._load_cache()
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                cached = json.load(f)
+            self.index = cached.get("index")
+            self.modes = cached.get("modes", [])
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable camera cache: {str(e)}")
+
+    def _save_cache(self):
+        ensure_dir(os.path.dirname(self.cache_path))
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"index": self.index, "modes": self.modes}, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def _open(self, index):
+        import cv2
+
+        cap = cv2.VideoCapture(index)
+        if cap.isOpened():
+            # Keep the driver queue short so a warm device does not hand out stale frames
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            return cap
+        cap.release()
+        return None
+
+    def discover(self, keep_open=True):
+        """Find a working camera, preferring the cached index, and cache its modes."""
+        index = self._discover(keep_open)
+        if not self.keep_warm:
+            # close() may have run while the device was being opened and found the
+            # lock taken; release the device now that the lock is free
+            self.close()
+        return index
+
+    def _discover(self, keep_open):
+        with self.lock, instrument.span("camera.discover"):
+            if self.cap is not None and self.cap.isOpened():
+                return self.index
+
+            candidates = list(PROBE_INDICES)
+            if self.index in candidates:
+                candidates.remove(self.index)
+                candidates.insert(0, self.index)
+
+            previous = self.index
+            for index in candidates:
+                print(f"Trying camera index {index}")
+                cap = self._open(index)
+                if cap is None:
+                    continue
+                self.index = index
+                if index != previous or not self.modes:
+                    with instrument.span("camera.probe_modes"):
+                        self.modes = probe_modes(cap)
+                    # Probing leaves the last mode applied; reopen with driver defaults
+                    cap.release()
+                    cap = self._open(index)
+                    if cap is None:
+                        continue
+                self._save_cache()
+                if keep_open and self.keep_warm:
+                    with instrument.span("camera.negotiate"):
+                        self.negotiated = negotiate(cap, self.modes, self.target)
+                    if self.keep_warm:
+                        self.cap = cap
+                    else:
+                        cap.release()
+                else:
+                    cap.release()
+                return index
+
+            self.index = None
+            self.modes = []
+            return None
+
+    def warm_async(self):
+        """Open the camera in a background thread so it is ready when recording starts."""
+        self.keep_warm = True
+        threading.Thread(target=self.discover, name="camera-warm", daemon=True).start()
+
+    def acquire(self):
+        """Return an open capture device, opening it now if it is not already warm."""
+        self.keep_warm = True
+        with self.lock:
+            if self.cap is None or not self.cap.isOpened():
+                self.cap = None
+                self.discover()
+            return self.cap
+
+    def try_acquire(self):
+        """Return the warm device without waiting, or None if it is not open yet.
+
+        Never blocks, so the Tk thread can call it; when it returns None the
+        caller should wait for acquire() on another thread.
+        """
+        self.keep_warm = True
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            if self.cap is not None and self.cap.isOpened():
+                return self.cap
+            return None
+        finally:
+            self.lock.release()
+
+    def close(self):
+        """Release the device (e.g. when leaving the record screen)."""
+        self.keep_warm = False
+        # Never block the caller (the Tk thread) on an in-flight open; a running
+        # discover() checks keep_warm once it has the device and releases it itself
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+        finally:
+            self.lock.release()
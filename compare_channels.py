@@ -0,0 +1,76 @@
+import argparse
+import json
+import time
+import numpy as np
+import tensorflow as tf
+from model import COLOR_MODES, make_generators, build_model, train_dir, test_dir, batch_size
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    """Record the wall time of each training epoch."""
+
+    def on_train_begin(self, logs=None):
+        self.times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.times.append(time.perf_counter() - self.start)
+
+def inference_rate(model, channels, batch, iterations=20):
+    """Images per second of predict_on_batch on random input."""
+    images = np.random.default_rng(0).random((batch, 48, 48, channels), dtype=np.float32)
+    model.predict_on_batch(images)  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        model.predict_on_batch(images)
+    return batch * iterations / (time.perf_counter() - start)
+
+def compare(train_dir, test_dir, epochs, batch_size):
+    """Train the RGB and grayscale models on the same data and measure both."""
+    results = {}
+    for channels in sorted(COLOR_MODES, reverse=True):
+        name = COLOR_MODES[channels]
+        print(f"Training {name} model ({channels} channel(s)) for {epochs} epochs...")
+        tf.keras.utils.set_random_seed(0)
+        train_generator, test_generator = make_generators(train_dir, test_dir, batch_size, channels)
+        model = build_model(num_classes=train_generator.num_classes, channels=channels)
+        timer = EpochTimer()
+        history = model.fit(train_generator, validation_data=test_generator, epochs=epochs,
+                            callbacks=[timer], verbose=2)
+        loss, accuracy = model.evaluate(test_generator, verbose=0)
+        # The first epoch includes graph tracing, so it is left out of the average when possible
+        epoch_times = timer.times[1:] or timer.times
+        results[name] = {
+            "channels": channels,
+            "params": int(model.count_params()),
+            "test_accuracy": float(accuracy),
+            "test_loss": float(loss),
+            "best_val_accuracy": float(max(history.history["val_accuracy"])),
+            "epoch_s": float(np.mean(epoch_times)),
+            "images_per_sec_batch1": inference_rate(model, channels, 1),
+            "images_per_sec_batch64": inference_rate(model, channels, 64),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the RGB and grayscale emotion models')
+    parser.add_argument('--train-dir', type=str, default=train_dir, help='Training image directory')
+    parser.add_argument('--test-dir', type=str, default=test_dir, help='Test image directory')
+    parser.add_argument('--epochs', type=int, default=5, help='Epochs to train each variant (default: 5)')
+    parser.add_argument('--batch-size', type=int, default=batch_size, help='Training batch size')
+    parser.add_argument('--output', type=str, default="channel_comparison.json", help='Where to write the JSON results')
+    args = parser.parse_args()
+
+    results = compare(args.train_dir, args.test_dir, args.epochs, args.batch_size)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    columns = ["params", "test_accuracy", "epoch_s", "images_per_sec_batch1", "images_per_sec_batch64"]
+    print(f"\n{'model':10}" + "".join(f"{c:>24}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:10}" + "".join(f"{row[c]:>24.4g}" for c in columns))
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Default maximum Hamming distance (out of 64 bits) for two images to count as duplicates
+THRESHOLD = 4
+
+def _load_small(path):
+    """Load an image as a 9x8 grayscale thumbnail for dHash, or None if unreadable."""
+    import cv2
+
+    # Decoding at reduced size is much faster than a full decode and loses nothing at 9x8
+    image = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return None
+    return cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+
+def dhash_batch(thumbnails):
+    """Difference hashes for a (N, 8, 9) stack of thumbnails as N uint64 values."""
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(bits), 64), axis=1)
+    return packed.view(">u8").ravel().astype(np.uint64)
+
+def hash_images(paths, workers=8):
+    """Return (hashes, readable paths) for image files, decoding in parallel."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        thumbnails = list(pool.map(_load_small, paths))
+    keep = [i for i, t in enumerate(thumbnails) if t is not None]
+    if not keep:
+        return np.zeros(0, dtype=np.uint64), []
+    return dhash_batch(np.stack([thumbnails[i] for i in keep])), [paths[i] for i in keep]
+
+class MultiIndexHash:
+    """Near-neighbour index for 64-bit hashes under Hamming distance.
+
+    The hash is split into threshold + 1 chunks. Two hashes within the
+    threshold must agree exactly on at least one chunk (pigeonhole), so
+    exact lookups per chunk find every candidate; each candidate is then
+    checked with a full popcount. For small thresholds this keeps the whole
+    dedup pass close to linear in the number of images.
+    """
+
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+        chunks = threshold + 1
+        bounds = np.linspace(0, 64, chunks + 1).astype(int)
+        self.chunks = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self.tables = [{} for _ in self.chunks]
+        self.hashes = []
+
+    def _keys(self, value):
+        return [(value >> shift) & mask for shift, mask in self.chunks]
+
+    def query(self, value):
+        """Return the id of an indexed hash within the threshold, or None."""
+        seen = set()
+        for table, key in zip(self.tables, self._keys(value)):
+            for candidate in table.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if (self.hashes[candidate] ^ value).bit_count() <= self.threshold:
+                    return candidate
+        return None
+
+    def add(self, value):
+        index = len(self.hashes)
+        self.hashes.append(value)
+        for table, key in zip(self.tables, self._keys(value)):
+            table.setdefault(key, []).append(index)
+        return index
+
+def find_duplicates(paths, threshold=THRESHOLD, workers=8):
+    """Return [(duplicate path, kept path)]; the first of each near-identical group is kept."""
+    hashes, paths = hash_images(paths, workers)
+    index = MultiIndexHash(threshold)
+    kept = []
+    duplicates = []
+    for path, value in zip(paths, hashes.tolist()):
+        match = index.query(value)
+        if match is None:
+            index.add(value)
+            kept.append(path)
+        else:
+            duplicates.append((path, kept[match]))
+    return duplicates
+
+def list_images(directory):
+    """List images under a directory, in extraction order where a manifest gives one.
+
+    Frames listed in an extract.py manifest come first in each folder, by
+    source and timestamp, so the earliest frame of a near-identical run is
+    the one kept; any other images follow in name order.
+    """
+    from extract import MANIFEST_NAME, read_manifest
+
+    paths = []
+    for root, _, names in sorted(os.walk(directory)):
+        listed = []
+        if MANIFEST_NAME in names:
+            rows = sorted(read_manifest(root), key=lambda r: (r["source"], r["timestamp"]))
+            listed = [row["path"] for row in rows if row["file"].lower().endswith(IMAGE_EXTENSIONS)]
+        known = set(listed)
+        paths.extend(listed)
+        paths.extend(sorted(p for p in (os.path.join(root, n) for n in names)
+                            if p.lower().endswith(IMAGE_EXTENSIONS) and p not in known))
+    return paths
+
+def format_bytes(count):
+    return f"{count / (1024 * 1024):.1f} MB"
+
+def main():
+    parser = argparse.ArgumentParser(description='Find and remove near-duplicate images with perceptual hashes')
+    parser.add_argument('directory', nargs='?', default='data', help='Image directory, searched recursively')
+    parser.add_argument('--threshold', type=int, default=THRESHOLD,
+                        help=f'Maximum differing hash bits (of 64) for a duplicate (default: {THRESHOLD})')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel image decoders (default: 8)')
+    parser.add_argument('--delete', action='store_true', help='Delete duplicates (default: only report them)')
+    parser.add_argument('--verbose', action='store_true', help='List every duplicate and the image it matches')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = list_images(args.directory)
+    duplicates = find_duplicates(paths, args.threshold, args.workers)
+    elapsed = time.perf_counter() - start
+
+    saved = sum(os.path.getsize(path) for path, _ in duplicates)
+    if args.verbose:
+        for path, original in duplicates:
+            print(f"{path} ~ {original}")
+    if args.delete:
+        for path, _ in duplicates:
+            os.remove(path)
+
+    action = "Deleted" if args.delete else "Found"
+    print(f"{action} {len(duplicates)} duplicates among {len(paths)} images in {elapsed:.1f}s; "
+          f"{format_bytes(saved)} {'freed' if args.delete else 'can be freed'}")
+
+if __name__ == "__main__":
+    main()
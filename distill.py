@@ -0,0 +1,191 @@
+import argparse
+import gzip
+import json
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from model import make_generators, build_student, train_dir, test_dir, batch_size
+from utils import ensure_dir
+
+teacher_path = "emotion_model.h5"
+output_dir = "models/distilled"
+
+class Distiller(tf.keras.Model):
+    """Trains a student on a mix of the true labels and the teacher's softened predictions."""
+
+    def __init__(self, student, teacher, temperature=4.0, alpha=0.1):
+        super().__init__()
+        self.student = student
+        self.teacher = teacher
+        # The student's layer before the final softmax gives its logits
+        self.student_logits = tf.keras.Model(student.inputs, student.layers[-2].output)
+        self.temperature = temperature
+        self.alpha = alpha
+        self.accuracy = tf.keras.metrics.CategoricalAccuracy(name="accuracy")
+        self.loss_tracker = tf.keras.metrics.Mean(name="loss")
+
+    @property
+    def metrics(self):
+        return [self.loss_tracker, self.accuracy]
+
+    def call(self, images, training=False):
+        return self.student(images, training=training)
+
+    def train_step(self, data):
+        images, labels = data
+        teacher_probs = self.teacher(images, training=False)
+        # The teacher ends in a softmax; p ** (1 / T), renormalised, is softmax(logits / T)
+        soft_targets = teacher_probs ** (1.0 / self.temperature)
+        soft_targets /= tf.reduce_sum(soft_targets, axis=-1, keepdims=True)
+
+        with tf.GradientTape() as tape:
+            logits = self.student_logits(images, training=True)
+            hard_loss = tf.keras.losses.categorical_crossentropy(labels, logits, from_logits=True)
+            soft_loss = tf.keras.losses.categorical_crossentropy(
+                soft_targets, logits / self.temperature, from_logits=True)
+            # T^2 keeps the soft-target gradients on the same scale as the hard ones
+            loss = tf.reduce_mean(self.alpha * hard_loss
+                                  + (1 - self.alpha) * soft_loss * self.temperature ** 2)
+
+        variables = self.student.trainable_variables
+        self.optimizer.apply_gradients(zip(tape.gradient(loss, variables), variables))
+        self.loss_tracker.update_state(loss)
+        self.accuracy.update_state(labels, tf.nn.softmax(logits))
+        return {m.name: m.result() for m in self.metrics}
+
+    def test_step(self, data):
+        images, labels = data
+        probs = self.student(images, training=False)
+        self.loss_tracker.update_state(tf.keras.losses.categorical_crossentropy(labels, probs))
+        self.accuracy.update_state(labels, probs)
+        return {m.name: m.result() for m in self.metrics}
+
+def prune_weights(model, sparsity):
+    """Zero the smallest-magnitude fraction of every kernel; returns the (weight, mask) pairs."""
+    masks = []
+    for weight in model.trainable_weights:
+        if "kernel" not in weight.name:
+            continue
+        values = weight.numpy()
+        threshold = np.quantile(np.abs(values), sparsity)
+        mask = (np.abs(values) > threshold).astype(values.dtype)
+        weight.assign(values * mask)
+        masks.append((weight, mask))
+    return masks
+
+class KeepPruned(tf.keras.callbacks.Callback):
+    """Re-apply pruning masks after every fine-tuning step so pruned weights stay zero."""
+
+    def __init__(self, masks):
+        super().__init__()
+        self.masks = masks
+
+    def on_train_batch_end(self, batch, logs=None):
+        for weight, mask in self.masks:
+            weight.assign(weight * mask)
+
+def nonzero_params(model):
+    return int(sum(np.count_nonzero(w) for w in model.get_weights()))
+
+def measure_latency(model, batch, iterations=30):
+    """Mean milliseconds per predict_on_batch call on random input."""
+    images = np.random.default_rng(0).random((batch,) + tuple(model.input_shape[1:]), dtype=np.float32)
+    model.predict_on_batch(images)  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        model.predict_on_batch(images)
+    return (time.perf_counter() - start) * 1000 / iterations
+
+def measure(name, model, test_generator, path):
+    """Accuracy, size and CPU latency at batch 1 and 64 for one model."""
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    _, accuracy = model.evaluate(test_generator, verbose=0)
+    with open(path, "rb") as f:
+        compressed = len(gzip.compress(f.read()))
+    batch64_ms = measure_latency(model, 64)
+    return {
+        "name": name,
+        "path": path,
+        "accuracy": float(accuracy),
+        "params": int(model.count_params()),
+        "nonzero_params": nonzero_params(model),
+        "compressed_bytes": compressed,
+        "batch1_ms": measure_latency(model, 1),
+        "batch64_ms": batch64_ms,
+        "batch64_images_per_sec": 64 * 1000 / batch64_ms,
+    }
+
+def pareto_front(rows):
+    """Mark rows no other row beats on both accuracy and batch-1 latency."""
+    for row in rows:
+        row["pareto"] = not any(
+            other["accuracy"] >= row["accuracy"] and other["batch1_ms"] <= row["batch1_ms"]
+            and (other["accuracy"] > row["accuracy"] or other["batch1_ms"] < row["batch1_ms"])
+            for other in rows
+        )
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Distil the emotion model into a family of compact students')
+    parser.add_argument('--teacher', type=str, default=teacher_path, help='Trained teacher model')
+    parser.add_argument('--train-dir', type=str, default=train_dir, help='Training image directory')
+    parser.add_argument('--test-dir', type=str, default=test_dir, help='Test image directory')
+    parser.add_argument('--widths', type=float, nargs='+', default=[0.25, 0.5, 1.0],
+                        help='Student width multipliers (default: 0.25 0.5 1.0)')
+    parser.add_argument('--sparsities', type=float, nargs='+', default=[0.0, 0.5, 0.8],
+                        help='Magnitude-pruning levels per student; 0 keeps it dense (default: 0 0.5 0.8)')
+    parser.add_argument('--epochs', type=int, default=15, help='Distillation epochs per student (default: 15)')
+    parser.add_argument('--finetune-epochs', type=int, default=2,
+                        help='Fine-tuning epochs after pruning (default: 2)')
+    parser.add_argument('--temperature', type=float, default=4.0, help='Softening temperature (default: 4)')
+    parser.add_argument('--alpha', type=float, default=0.1,
+                        help='Weight of the true-label loss vs the teacher loss (default: 0.1)')
+    parser.add_argument('--batch-size', type=int, default=batch_size, help='Training batch size')
+    parser.add_argument('--output-dir', type=str, default=output_dir, help='Where to save the students')
+    args = parser.parse_args()
+
+    ensure_dir(args.output_dir)
+    teacher = tf.keras.models.load_model(args.teacher)
+    channels = teacher.input_shape[-1]
+    train_generator, test_generator = make_generators(args.train_dir, args.test_dir, args.batch_size, channels)
+    num_classes = train_generator.num_classes
+
+    rows = [measure("teacher", teacher, test_generator, args.teacher)]
+    for width in args.widths:
+        print(f"Distilling student with width {width}...")
+        student = build_student(num_classes, channels, width)
+        distiller = Distiller(student, teacher, args.temperature, args.alpha)
+        distiller.compile(optimizer='adam')
+        distiller.fit(train_generator, validation_data=test_generator, epochs=args.epochs, verbose=2)
+        dense_weights = student.get_weights()
+
+        for sparsity in args.sparsities:
+            name = f"student_w{width:g}_s{sparsity:g}"
+            student.set_weights(dense_weights)
+            if sparsity > 0:
+                print(f"Pruning {name} to {sparsity:.0%} sparsity and fine-tuning...")
+                masks = prune_weights(student, sparsity)
+                distiller = Distiller(student, teacher, args.temperature, args.alpha)
+                distiller.compile(optimizer=tf.keras.optimizers.Adam(1e-4))
+                distiller.fit(train_generator, epochs=args.finetune_epochs,
+                              callbacks=[KeepPruned(masks)], verbose=2)
+            path = os.path.join(args.output_dir, f"{name}.h5")
+            student.save(path)
+            rows.append(measure(name, student, test_generator, path))
+
+    pareto_front(rows)
+    with open(os.path.join(args.output_dir, "results.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+
+    print(f"\n{'model':24} {'accuracy':>9} {'params':>9} {'nonzero':>9} {'gzip KB':>9} "
+          f"{'b1 ms':>8} {'b64 img/s':>10}  pareto")
+    for row in sorted(rows, key=lambda r: r["batch1_ms"]):
+        print(f"{row['name']:24} {row['accuracy']:9.4f} {row['params']:9d} {row['nonzero_params']:9d} "
+              f"{row['compressed_bytes'] / 1024:9.1f} {row['batch1_ms']:8.2f} "
+              f"{row['batch64_images_per_sec']:10.0f}  {'*' if row['pareto'] else ''}")
+    print("Pruned weights are stored as zeros: they shrink the compressed file, "
+          "while latency only drops with width.")
+
+if __name__ == "__main__":
+    main()
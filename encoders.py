@@ -0,0 +1,195 @@
+import math
+import os
+import shutil
+from bisect import bisect_right
+import subprocess
+
+# Set EJ_FFMPEG to use a specific ffmpeg binary instead of the one on PATH
+FFMPEG_ENV = "EJ_FFMPEG"
+
+# Video encoders in order of preference, with the flags each preset maps to
+FFMPEG_CODECS = ["libx264", "libvpx-vp9", "mpeg4"]
+FFMPEG_PRESETS = {
+    "fast": {
+        "libx264": ["-preset", "ultrafast", "-crf", "26"],
+        "libvpx-vp9": ["-deadline", "realtime", "-cpu-used", "8", "-crf", "36", "-b:v", "0"],
+        "mpeg4": ["-q:v", "8"],
+    },
+    "balanced": {
+        "libx264": ["-preset", "veryfast", "-crf", "23"],
+        "libvpx-vp9": ["-deadline", "realtime", "-cpu-used", "5", "-crf", "33", "-b:v", "0"],
+        "mpeg4": ["-q:v", "5"],
+    },
+    "quality": {
+        "libx264": ["-preset", "medium", "-crf", "20"],
+        "libvpx-vp9": ["-deadline", "good", "-cpu-used", "2", "-crf", "30", "-b:v", "0"],
+        "mpeg4": ["-q:v", "3"],
+    },
+}
+
+# Storage profiles applied when saving (and by transcode.py to existing entries).
+# max_height/max_fps of None keep the source value; crf is in libx264 units.
+STORAGE_PROFILES = {
+    "archive": {"max_height": None, "max_fps": None, "preset": "quality", "crf": 18},
+    "standard": {"max_height": 720, "max_fps": 30, "preset": "balanced", "crf": 23},
+    "compact": {"max_height": 480, "max_fps": 20, "preset": "balanced", "crf": 28},
+}
+DEFAULT_STORAGE_PROFILE = "standard"
+
+_ffmpeg_info = {}
+
+def find_ffmpeg():
+    """Return the path of the ffmpeg binary, or None if it is not installed."""
+    if "path" not in _ffmpeg_info:
+        _ffmpeg_info["path"] = os.environ.get(FFMPEG_ENV) or shutil.which("ffmpeg")
+    return _ffmpeg_info["path"]
+
+def ffmpeg_codec():
+    """Return the most preferred video encoder the local ffmpeg supports, or None."""
+    if "codec" not in _ffmpeg_info:
+        _ffmpeg_info["codec"] = None
+        ffmpeg = find_ffmpeg()
+        if ffmpeg:
+            try:
+                out = subprocess.run([ffmpeg, "-hide_banner", "-encoders"],
+                                     capture_output=True, text=True, timeout=10).stdout
+                available = {line.split()[1] for line in out.splitlines()
+                             if len(line.split()) > 1 and line.startswith(" V")}
+                _ffmpeg_info["codec"] = next((c for c in FFMPEG_CODECS if c in available), None)
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"Could not query ffmpeg encoders: {str(e)}")
+    return _ffmpeg_info["codec"]
+
+def vfr_args():
+    """Return the ffmpeg output flags for variable-frame-rate timestamps.
+
+    ffmpeg 5.1 renamed -vsync to -fps_mode; older builds only know -vsync.
+    """
+    if "vfr_args" not in _ffmpeg_info:
+        _ffmpeg_info["vfr_args"] = ["-vsync", "vfr"]
+        ffmpeg = find_ffmpeg()
+        if ffmpeg:
+            try:
+                out = subprocess.run([ffmpeg, "-hide_banner", "-h", "long"],
+                                     capture_output=True, text=True, timeout=10).stdout
+                if "-fps_mode" in out:
+                    _ffmpeg_info["vfr_args"] = ["-fps_mode", "vfr"]
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"Could not query ffmpeg options: {str(e)}")
+    return _ffmpeg_info["vfr_args"]
+
+def codec_args(codec, preset="balanced", crf=None):
+    """Return the ffmpeg encoder flags for a preset, optionally overriding its CRF."""
+    args = list(FFMPEG_PRESETS[preset][codec])
+    if crf is not None and "-crf" in args:
+        # libvpx-vp9 uses a 0-63 scale; shift libx264-style values roughly onto it
+        value = crf + 10 if codec == "libvpx-vp9" else crf
+        args[args.index("-crf") + 1] = str(value)
+    return args
+
+def profile_size(width, height, profile):
+    """Return the (even) output size for a frame size under a storage profile."""
+    max_height = STORAGE_PROFILES[profile]["max_height"]
+    if max_height and height > max_height:
+        width = width * max_height / height
+        height = max_height
+    return int(width) // 2 * 2, int(height) // 2 * 2
+
+def profile_fps(fps, profile):
+    """Return the output frame rate for a source rate under a storage profile."""
+    max_fps = STORAGE_PROFILES[profile]["max_fps"]
+    return min(fps, max_fps) if max_fps else fps
+
+def frame_indices(count, fps, out_fps):
+    """Indices of the source frames to keep when converting count frames from fps to out_fps.
+
+    The first frame is always kept, so even a clip shorter than one output
+    frame (or a rate just above the cap) still produces a video.
+    """
+    if out_fps >= fps:
+        return range(count)
+    step = fps / out_fps
+    return sorted({min(int(i * step), count - 1) for i in range(math.ceil(count / step))})
+
+def timestamp_indices(timestamps, fps):
+    """Indices of the frames to show at each tick of a constant fps clock.
+
+    timestamps are the capture times (seconds, ascending) of frames kept by
+    a motion-gated recording; each tick shows the latest frame captured at or
+    before it, so a frame is repeated for as long as the scene stayed still.
+    """
+    if not timestamps:
+        return []
+    start = timestamps[0]
+    ticks = int(round((timestamps[-1] - start) * fps)) + 1
+    return [bisect_right(timestamps, start + k / fps) - 1 for k in range(ticks)]
+
+class FFmpegWriter:
+    """A cv2.VideoWriter-compatible writer that pipes raw BGR frames into ffmpeg.
+
+    With vfr=True repeated frames are dropped by ffmpeg (mpdecimate) before
+    encoding and the file keeps the timestamps of the rest, so still
+    stretches cost neither encode time nor space.
+    """
+
+    def __init__(self, path, fps, size, codec=None, preset="balanced", threads=0, crf=None, vfr=False):
+        self.path = path
+        self.size = size
+        self.codec = codec or ffmpeg_codec()
+        self.process = None
+        ffmpeg = find_ffmpeg()
+        if not ffmpeg or not self.codec:
+            return
+
+        width, height = size
+        # Even dimensions are required for yuv420p
+        filters = "pad=ceil(iw/2)*2:ceil(ih/2)*2"
+        if vfr:
+            filters = "mpdecimate," + filters
+        command = [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+            "-r", f"{fps:.3f}", "-i", "-",
+            "-an", "-c:v", self.codec,
+        ] + codec_args(self.codec, preset, crf) + [
+            "-threads", str(threads),
+            "-pix_fmt", "yuv420p",
+            "-vf", filters,
+        ] + (vfr_args() if vfr else []) + [
+            "-movflags", "+faststart",
+            path,
+        ]
+        try:
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            print(f"Could not start ffmpeg: {str(e)}")
+            self.process = None
+
+    def isOpened(self):
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame):
+        try:
+            if frame.flags["C_CONTIGUOUS"]:
+                self.process.stdin.write(frame.data)
+            else:
+                self.process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            # ffmpeg exited early; release() reports its error output
+            self.release()
+            raise RuntimeError("ffmpeg stopped accepting frames")
+
+    def release(self):
+        """Flush the encoder and wait for ffmpeg to finish writing the file."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        errors = self.process.stderr.read().decode(errors="replace").strip()
+        self.process.wait()
+        if self.process.returncode != 0:
+            print(f"ffmpeg exited with code {self.process.returncode}: {errors}")
+        self.process = None
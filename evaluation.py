@@ -0,0 +1,99 @@
+import numpy as np
+
+class EvaluationAccumulator:
+    """Streaming confusion matrix, loss and calibration statistics.
+
+    Feed it one batch of labels and predicted probabilities at a time; only
+    fixed-size count arrays are kept, so memory does not grow with the
+    number of evaluated images.
+    """
+
+    def __init__(self, class_names, num_bins=10):
+        self.class_names = list(class_names)
+        self.num_classes = len(self.class_names)
+        self.num_bins = num_bins
+        self.confusion = np.zeros((self.num_classes, self.num_classes), dtype=np.int64)
+        self.bin_counts = np.zeros(num_bins, dtype=np.int64)
+        self.bin_confidence = np.zeros(num_bins, dtype=np.float64)
+        self.bin_correct = np.zeros(num_bins, dtype=np.int64)
+        self.loss_sum = 0.0
+        self.count = 0
+
+    def update(self, labels, probs):
+        """Add a batch of integer (or one-hot) labels and probability rows."""
+        labels = np.asarray(labels)
+        if labels.ndim == 2:
+            labels = labels.argmax(axis=1)
+        labels = labels.astype(np.int64)
+        probs = np.asarray(probs, dtype=np.float64)
+        if not len(labels):
+            return
+
+        predicted = probs.argmax(axis=1)
+        confidence = probs[np.arange(len(labels)), predicted]
+        correct = predicted == labels
+
+        # Confusion matrix via a single bincount over flattened (true, pred) pairs
+        flat = labels * self.num_classes + predicted
+        self.confusion += np.bincount(flat, minlength=self.num_classes ** 2).reshape(
+            self.num_classes, self.num_classes)
+
+        bins = np.minimum((confidence * self.num_bins).astype(np.int64), self.num_bins - 1)
+        self.bin_counts += np.bincount(bins, minlength=self.num_bins)
+        self.bin_confidence += np.bincount(bins, weights=confidence, minlength=self.num_bins)
+        self.bin_correct += np.bincount(bins, weights=correct, minlength=self.num_bins).astype(np.int64)
+
+        true_probs = np.clip(probs[np.arange(len(labels)), labels], 1e-7, 1.0)
+        self.loss_sum += float(-np.log(true_probs).sum())
+        self.count += len(labels)
+
+    def per_class(self):
+        """Return precision, recall, F1 and support for each class."""
+        tp = np.diag(self.confusion).astype(np.float64)
+        predicted = self.confusion.sum(axis=0)
+        support = self.confusion.sum(axis=1)
+        precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+        recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+        denom = precision + recall
+        f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(tp), where=denom > 0)
+        return {
+            name: {
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1": float(f1[i]),
+                "support": int(support[i]),
+            }
+            for i, name in enumerate(self.class_names)
+        }
+
+    def calibration(self):
+        """Return reliability-diagram bins and the expected calibration error."""
+        bins = []
+        ece = 0.0
+        for i in range(self.num_bins):
+            n = int(self.bin_counts[i])
+            confidence = self.bin_confidence[i] / n if n else 0.0
+            accuracy = self.bin_correct[i] / n if n else 0.0
+            if self.count:
+                ece += n / self.count * abs(accuracy - confidence)
+            bins.append({
+                "lower": i / self.num_bins,
+                "upper": (i + 1) / self.num_bins,
+                "count": n,
+                "confidence": float(confidence),
+                "accuracy": float(accuracy),
+            })
+        return {"bins": bins, "ece": float(ece)}
+
+    def report(self):
+        """Build a JSON-serialisable summary of everything accumulated so far."""
+        correct = int(np.trace(self.confusion))
+        return {
+            "samples": self.count,
+            "accuracy": correct / self.count if self.count else 0.0,
+            "loss": self.loss_sum / self.count if self.count else 0.0,
+            "classes": self.class_names,
+            "confusion_matrix": self.confusion.tolist(),
+            "per_class": self.per_class(),
+            "calibration": self.calibration(),
+        }
@@ -1,114 +1,272 @@
 import cv2
+import hashlib
+import json
+import numpy as np
 import os
 import argparse
 from datetime import timedelta
 
+# Size frames are shrunk to before scoring change in adaptive mode
+SCORE_SIZE = (64, 36)
+HIST_BINS = 32
+
+# Written next to the frames; one JSON object per extracted frame
+MANIFEST_NAME = "manifest.jsonl"
+
 # Function to format time as HH:MM:SS
 def format_time(seconds):
     return str(timedelta(seconds=seconds)).split('.')[0]
 
-# Parse command line arguments
-parser = argparse.ArgumentParser(description='Extract frames from video at specific time intervals')
-parser.add_argument('--video', type=str, default=r"/home/anonymus/emotional_journal/videos/y4uth4.mp4", 
-                    help='Path to the video file')
-parser.add_argument('--interval', type=float, default=1.0, 
-                    help='Time interval between frames in seconds (default: 1.0)')
-parser.add_argument('--start', type=float, default=0.0, 
-                    help='Start time in seconds (default: 0.0)')
-parser.add_argument('--end', type=float, default=-1, 
-                    help='End time in seconds, -1 for full video (default: -1)')
-parser.add_argument('--output', type=str, default='data', 
-                    help='Output directory (default: data)')
-
-args = parser.parse_args()
-
-# Open the video file
-video_path = args.video
-vid = cv2.VideoCapture(video_path)
-
-# Check if video opened successfully
-if not vid.isOpened():
-    print(f"Error: Could not open video file: {video_path}")
-    exit()
-
-# Get video properties
-fps = vid.get(cv2.CAP_PROP_FPS)
-total_frames = int(vid.get(cv2.CAP_PROP_FRAME_COUNT))
-duration = total_frames / fps if fps > 0 else 0
-
-print(f"Video properties:")
-print(f"FPS: {fps}")
-print(f"Total frames: {total_frames}")
-print(f"Duration: {format_time(duration)}")
-
-# Determine frame interval based on time interval
-frame_interval = int(fps * args.interval)
-if frame_interval < 1:
-    frame_interval = 1
-
-# Determine start and end frames
-start_frame = int(args.start * fps)
-if args.end < 0:
-    end_frame = total_frames
-else:
-    end_frame = int(args.end * fps)
-
-# Create output directory if it doesn't exist
-if not os.path.exists(args.output):
-    os.makedirs(args.output)
-
-print(f"Extracting frames every {args.interval} seconds (every {frame_interval} frames)")
-print(f"Time range: {format_time(args.start)} to {format_time(args.end if args.end > 0 else duration)}")
-print("Press 'q' to stop extraction")
-
-# Set the video position to start frame
-vid.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-
-current_frame = start_frame
-frames_extracted = 0
-
-while current_frame < end_frame:
-    # Read the frame
-    success, frame = vid.read()
-    
-    # Break if reached end of video
-    if not success:
-        print("End of video file reached")
-        break
-    
-    # Get current timestamp in seconds
-    current_time = current_frame / fps
-    time_str = format_time(current_time)
-    
-    # Add timestamp to the frame
-    cv2.putText(frame, f"Time: {time_str}", (10, 30), 
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    
-    # Display the frame
-    cv2.imshow("Extracting Frames", frame)
-    
-    # Save only frames at specified intervals
-    if (current_frame - start_frame) % frame_interval == 0:
-        # Create filename with timestamp
-        output_path = f"{args.output}/frame_{time_str.replace(':', '_')}.jpg"
-        cv2.imwrite(output_path, frame)
-        frames_extracted += 1
-        
-        # Print progress
-        if frames_extracted % 10 == 0:
-            print(f"Extracted {frames_extracted} frames ({time_str} / {format_time(duration)})")
-    
-    # Increment frame counter
-    current_frame += 1
-    
-    # Exit if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        print("Extraction stopped by user")
-        break
-
-# Release resources
-vid.release()
-cv2.destroyAllWindows()
-
-print(f"Successfully extracted {frames_extracted} frames to the '{args.output}' folder")
-print(f"Time range: {format_time(args.start)} to {format_time(current_time)}")
\ No newline at end of file
+def thumbnail(frame):
+    """Small grayscale copy of a frame used for change scoring."""
+    small = cv2.resize(frame, SCORE_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+def change_score(previous, current, method="diff"):
+    """How different two thumbnails are, from 0 (identical) to 1.
+
+    "diff" is the mean absolute pixel difference; "hist" is half the L1
+    distance between normalised brightness histograms, which ignores small
+    movements and reacts to lighting and scene changes.
+    """
+    if method == "hist":
+        bins = np.linspace(0, 256, HIST_BINS + 1)
+        a = np.histogram(previous, bins)[0] / previous.size
+        b = np.histogram(current, bins)[0] / current.size
+        return float(np.abs(a - b).sum() / 2)
+    return float(np.abs(previous.astype(np.int16) - current.astype(np.int16)).mean() / 255)
+
+def frame_filename(video_path, index, timestamp):
+    """Collision-free name for a frame: source video, frame index and millisecond timestamp.
+
+    A short hash of the video's full path keeps videos with the same file
+    name in different folders apart.
+    """
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    source_id = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}_{source_id}_frame_{index:06d}_{int(round(timestamp * 1000))}ms.jpg"
+
+def read_manifest(output):
+    """Load the manifest of an extraction directory (or a manifest path).
+
+    Returns one dict per frame with frame_index, timestamp (seconds), source
+    and file, plus "path": the frame's full path. Rows whose frame has since
+    been deleted (e.g. by dedup.py) are left out.
+    """
+    manifest_path = output if output.endswith(".jsonl") else os.path.join(output, MANIFEST_NAME)
+    directory = os.path.dirname(manifest_path)
+    rows = []
+    if not os.path.exists(manifest_path):
+        return rows
+    with open(manifest_path, "r") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                row["path"] = os.path.join(directory, row["file"])
+                if os.path.exists(row["path"]):
+                    rows.append(row)
+    return rows
+
+def write_manifest(output, source, rows, covered=None, replace=False):
+    """Merge one extraction run of a source video into the manifest.
+
+    covered is the (start, end) time range in seconds the run actually read.
+    With replace=True, earlier frames of the same video inside that range
+    that the run did not write again are deleted and dropped from the
+    manifest. Otherwise, and always for frames outside the range or from
+    other videos, earlier frames are kept.
+    """
+    manifest_path = os.path.join(output, MANIFEST_NAME)
+    existing = read_manifest(output)
+    written = {r["file"] for r in rows}
+    kept = []
+    for row in existing:
+        if row["file"] in written:
+            continue
+        stale = (replace and row["source"] == source and covered is not None
+                 and covered[0] <= row["timestamp"] <= covered[1])
+        if stale:
+            os.remove(row["path"])
+        else:
+            kept.append(row)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        for row in kept + rows:
+            row = {k: v for k, v in row.items() if k != "path"}
+            f.write(json.dumps(row) + "\n")
+    os.replace(tmp_path, manifest_path)
+
+def extract_frames(video_path, output='data', interval=1.0, start=0.0, end=-1, show=True,
+                   mode="interval", threshold=0.04, min_gap=0.25, max_gap=5.0, score="diff", replace=False):
+    """Extract frames from a video and return the number written.
+
+    Frames are named by source video, frame index and timestamp (see
+    frame_filename), and each one is listed in the directory's manifest
+    (see read_manifest), so downstream tools need not parse file names.
+    mode="interval" saves a frame every `interval` seconds. mode="adaptive"
+    saves a keyframe when the scene has changed by at least `threshold`
+    (see change_score) since the last saved frame, but never more often than
+    every `min_gap` seconds and never less often than every `max_gap` seconds.
+    With replace=True, frames from an earlier extraction of the same video in
+    the time range this run covered are deleted if this run did not keep them.
+    """
+    # Open the video file
+    vid = cv2.VideoCapture(video_path)
+
+    # Check if video opened successfully
+    if not vid.isOpened():
+        print(f"Error: Could not open video file: {video_path}")
+        return 0
+
+    # Get video properties
+    fps = vid.get(cv2.CAP_PROP_FPS)
+    total_frames = int(vid.get(cv2.CAP_PROP_FRAME_COUNT))
+    duration = total_frames / fps if fps > 0 else 0
+
+    print(f"Video properties:")
+    print(f"FPS: {fps}")
+    print(f"Total frames: {total_frames}")
+    print(f"Duration: {format_time(duration)}")
+
+    # Determine frame interval based on time interval
+    frame_interval = int(fps * interval)
+    if frame_interval < 1:
+        frame_interval = 1
+
+    # Determine start and end frames
+    start_frame = int(start * fps)
+    if end < 0:
+        end_frame = total_frames
+    else:
+        end_frame = int(end * fps)
+
+    # Create output directory if it doesn't exist
+    if not os.path.exists(output):
+        os.makedirs(output)
+
+    if mode == "adaptive":
+        print(f"Extracting keyframes on {score} change >= {threshold} (gap {min_gap}s to {max_gap}s)")
+    else:
+        print(f"Extracting frames every {interval} seconds (every {frame_interval} frames)")
+    print(f"Time range: {format_time(start)} to {format_time(end if end > 0 else duration)}")
+    if show:
+        print("Press 'q' to stop extraction")
+
+    # Set the video position to start frame
+    vid.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    current_frame = start_frame
+    current_time = start
+    frames_extracted = 0
+    manifest_rows = []
+    source = os.path.abspath(video_path)
+    last_saved_time = None
+    last_saved_thumb = None
+    first_time = None
+
+    while current_frame < end_frame:
+        # Read the frame
+        success, frame = vid.read()
+
+        # Break if reached end of video
+        if not success:
+            print("End of video file reached")
+            break
+
+        # Get current timestamp in seconds; the container timestamp is exact even for
+        # variable-frame-rate videos, the frame count is the fallback
+        current_time = vid.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if current_time <= 0 and current_frame > 0:
+            current_time = current_frame / fps
+        if first_time is None:
+            first_time = current_time
+        time_str = format_time(current_time)
+
+        if mode == "adaptive":
+            # Score before the timestamp is drawn so the overlay does not count as change
+            thumb = thumbnail(frame)
+            if last_saved_time is None:
+                save = True
+            else:
+                gap = current_time - last_saved_time
+                save = gap >= max_gap or (gap >= min_gap
+                                          and change_score(last_saved_thumb, thumb, score) >= threshold)
+        else:
+            save = (current_frame - start_frame) % frame_interval == 0
+
+        # Add timestamp to the frame
+        cv2.putText(frame, f"Time: {time_str}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+        # Display the frame
+        if show:
+            cv2.imshow("Extracting Frames", frame)
+
+        # Save only frames at specified intervals (or keyframes in adaptive mode)
+        if save:
+            if mode == "adaptive":
+                last_saved_time = current_time
+                last_saved_thumb = thumb
+            # Create filename with frame index and timestamp
+            filename = frame_filename(video_path, current_frame, current_time)
+            cv2.imwrite(os.path.join(output, filename), frame)
+            manifest_rows.append({"frame_index": current_frame, "timestamp": round(current_time, 6),
+                                  "source": source, "file": filename})
+            frames_extracted += 1
+
+            # Print progress
+            if frames_extracted % 10 == 0:
+                print(f"Extracted {frames_extracted} frames ({time_str} / {format_time(duration)})")
+
+        # Increment frame counter
+        current_frame += 1
+
+        # Exit if 'q' is pressed
+        if show and cv2.waitKey(1) & 0xFF == ord('q'):
+            print("Extraction stopped by user")
+            break
+
+    # Release resources
+    vid.release()
+    if show:
+        cv2.destroyAllWindows()
+    # Only the stretch actually read (not the requested range) replaces earlier frames
+    covered = (first_time, current_time) if first_time is not None else None
+    write_manifest(output, source, manifest_rows, covered, replace)
+
+    print(f"Successfully extracted {frames_extracted} frames to the '{output}' folder")
+    print(f"Time range: {format_time(start)} to {format_time(current_time)}")
+    return frames_extracted
+
+if __name__ == "__main__":
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Extract frames from video at specific time intervals')
+    parser.add_argument('--video', type=str, default=r"/home/anonymus/emotional_journal/videos/y4uth4.mp4",
+                        help='Path to the video file')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Time interval between frames in seconds (default: 1.0)')
+    parser.add_argument('--start', type=float, default=0.0,
+                        help='Start time in seconds (default: 0.0)')
+    parser.add_argument('--end', type=float, default=-1,
+                        help='End time in seconds, -1 for full video (default: -1)')
+    parser.add_argument('--output', type=str, default='data',
+                        help='Output directory (default: data)')
+    parser.add_argument('--no-display', action='store_true',
+                        help='Do not show the extraction preview window')
+    parser.add_argument('--mode', choices=['interval', 'adaptive'], default='interval',
+                        help='Fixed interval sampling, or keyframes on scene/expression change (default: interval)')
+    parser.add_argument('--threshold', type=float, default=0.04,
+                        help='Adaptive: change score (0-1) that triggers a keyframe (default: 0.04)')
+    parser.add_argument('--min-gap', type=float, default=0.25,
+                        help='Adaptive: minimum seconds between keyframes (default: 0.25)')
+    parser.add_argument('--max-gap', type=float, default=5.0,
+                        help='Adaptive: maximum seconds without a keyframe (default: 5.0)')
+    parser.add_argument('--score', choices=['diff', 'hist'], default='diff',
+                        help='Adaptive: frame-difference or histogram change score (default: diff)')
+    parser.add_argument('--replace', action='store_true',
+                        help='Delete frames from an earlier run over the same time range that this run did not keep')
+
+    args = parser.parse_args()
+    extract_frames(args.video, args.output, args.interval, args.start, args.end,
+                   show=not args.no_display, mode=args.mode, threshold=args.threshold,
+                   min_gap=args.min_gap, max_gap=args.max_gap, score=args.score, replace=args.replace)
@@ -0,0 +1,117 @@
+import math
+import os
+
+FACE_CASCADE = "haarcascade_frontalface_default.xml"
+EYE_CASCADE = "haarcascade_eye.xml"
+
+# Size of the crops the emotion model is trained on
+FACE_SIZE = 48
+
+class FaceDetector:
+    """Find the main face in video frames and cut it out as a model-sized crop.
+
+    Detection runs on a copy downscaled to detect_width, which is several
+    times faster than the full frame and plenty for a face filling a webcam
+    shot. The crop itself is taken from the full-resolution frame.
+    """
+
+    def __init__(self, detect_width=320, scale_factor=1.1, min_neighbors=5, margin=0.1, align=False):
+        import cv2
+
+        path = os.path.join(cv2.data.haarcascades, FACE_CASCADE)
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise RuntimeError(f"Could not load face cascade {path}")
+        self.eye_cascade = None
+        if align:
+            path = os.path.join(cv2.data.haarcascades, EYE_CASCADE)
+            self.eye_cascade = cv2.CascadeClassifier(path)
+            if self.eye_cascade.empty():
+                raise RuntimeError(f"Could not load eye cascade {path}")
+        self.detect_width = detect_width
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.margin = margin
+
+    def detect(self, gray):
+        """Return the largest face box (x, y, w, h) in a grayscale frame, or None."""
+        import cv2
+
+        scale = min(1.0, self.detect_width / gray.shape[1])
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+        faces = self.cascade.detectMultiScale(small, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors, minSize=(24, 24))
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return tuple(int(v / scale) for v in (x, y, w, h))
+
+    def crop(self, frame, size=FACE_SIZE, channels=3):
+        """Return the main face of a BGR frame as a size x size uint8 crop, or None.
+
+        3-channel crops are RGB (the order Keras loads images in); 1-channel
+        crops are (size, size, 1) grayscale.
+        """
+        import cv2
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        box = self.detect(gray)
+        if box is None:
+            return None
+        x, y, w, h = box
+        pad = int(max(w, h) * self.margin)
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(frame.shape[1], x + w + pad), min(frame.shape[0], y + h + pad)
+        region = gray[y0:y1, x0:x1] if channels == 1 else frame[y0:y1, x0:x1]
+        if self.eye_cascade is not None:
+            region = self.align(gray[y0:y1, x0:x1], region)
+        face = cv2.resize(region, (size, size), interpolation=cv2.INTER_AREA)
+        if channels == 1:
+            return face[..., None]
+        return cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
+
+    def align(self, gray_face, region):
+        """Rotate a face region so the eyes are level; unchanged if two eyes are not found."""
+        import cv2
+
+        # Eyes are searched for in the upper half of the face only
+        eyes = self.eye_cascade.detectMultiScale(gray_face[:gray_face.shape[0] // 2],
+                                                 scaleFactor=1.1, minNeighbors=5)
+        if len(eyes) < 2:
+            return region
+        eyes = sorted(sorted(eyes, key=lambda e: e[2] * e[3])[-2:], key=lambda e: e[0])
+        (lx, ly), (rx, ry) = [(x + w / 2, y + h / 2) for x, y, w, h in eyes]
+        angle = math.degrees(math.atan2(ry - ly, rx - lx))
+        height, width = region.shape[:2]
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        return cv2.warpAffine(region, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE)
+
+def iter_video_faces(video_path, detector, interval=1.0, size=FACE_SIZE, channels=3):
+    """Yield (timestamp, crop) for the face in one frame every `interval` seconds.
+
+    Frames in between are only grabbed, not decoded into images. Sampling
+    follows the container timestamps, so variable-frame-rate entries (saved
+    with still frames skipped) are sampled evenly in time too.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 20
+    index = 0
+    next_sample = 0.0
+    try:
+        while cap.grab():
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if timestamp <= 0 and index > 0:
+                timestamp = index / fps
+            if timestamp >= next_sample:
+                next_sample = timestamp + interval
+                ret, frame = cap.retrieve()
+                if ret:
+                    face = detector.crop(frame, size, channels)
+                    if face is not None:
+                        yield timestamp, face
+            index += 1
+    finally:
+        cap.release()
@@ -0,0 +1,169 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Set EJ_TRACE to a file path to enable tracing; a .json suffix writes a Chrome
+# trace-event file (chrome://tracing, Perfetto), anything else writes JSONL.
+TRACE_ENV = "EJ_TRACE"
+
+class _NullSpan:
+    """Shared no-op span returned while tracing is disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    """A timed region recorded into the tracer when it exits."""
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer._add("X", self.name, self.start, end - self.start, self.args)
+        return False
+
+    def set(self, **args):
+        """Attach extra arguments to the span before it closes."""
+        self.args.update(args)
+
+class Tracer:
+    """Collects spans, counters and values in memory and exports them on demand."""
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def enable(self, path=None):
+        """Start recording; if a path is given the trace is written there at exit."""
+        self.enabled = True
+        if path and not self.path:
+            self.path = path
+            atexit.register(self.export)
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, **args):
+        """Return a context manager timing the enclosed block."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def count(self, name, value=1):
+        """Increment a named counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            total = self.counters.get(name, 0) + value
+            self.counters[name] = total
+        self._add("C", name, time.perf_counter_ns(), 0, {"value": total})
+
+    def record(self, name, value, **args):
+        """Record a point-in-time measurement such as fps or ms per frame."""
+        if not self.enabled:
+            return
+        args["value"] = value
+        self._add("C", name, time.perf_counter_ns(), 0, args)
+
+    def log(self, message, **args):
+        """Print a diagnostic message and keep it as an instant event in the trace."""
+        print(message)
+        if self.enabled:
+            args["message"] = message
+            self._add("i", "log", time.perf_counter_ns(), 0, args)
+
+    def _add(self, phase, name, start_ns, duration_ns, args):
+        event = (phase, name, start_ns, duration_ns, threading.get_ident(),
+                 threading.current_thread().name, args)
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        """Aggregate span durations into count/total/mean/max milliseconds per name."""
+        stats = {}
+        with self._lock:
+            events = list(self.events)
+        for phase, name, _, duration_ns, _, _, _ in events:
+            if phase != "X":
+                continue
+            entry = stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            ms = duration_ns / 1e6
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+        for entry in stats.values():
+            entry["mean_ms"] = entry["total_ms"] / entry["count"]
+        return stats
+
+    def export(self, path=None):
+        """Write the trace as Chrome trace events (.json) or JSONL (any other suffix)."""
+        path = path or self.path
+        if not path:
+            return None
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+
+        if path.endswith(".json"):
+            trace = []
+            for phase, name, start_ns, duration_ns, tid, thread_name, args in events:
+                event = {"name": name, "ph": phase, "ts": (start_ns - self._origin) / 1000,
+                         "pid": pid, "tid": tid, "args": args}
+                if phase == "X":
+                    event["dur"] = duration_ns / 1000
+                elif phase == "i":
+                    event["s"] = "t"
+                trace.append(event)
+            for tid, thread_name in {(e[4], e[5]) for e in events}:
+                trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                              "args": {"name": thread_name}})
+            with open(path, "w") as f:
+                json.dump({"traceEvents": trace, "otherData": {"counters": self.counters,
+                                                               "summary": self.summary()}}, f)
+        else:
+            with open(path, "w") as f:
+                for phase, name, start_ns, duration_ns, tid, thread_name, args in events:
+                    f.write(json.dumps({
+                        "type": {"X": "span", "C": "value", "i": "log"}[phase],
+                        "name": name,
+                        "ts_ms": (start_ns - self._origin) / 1e6,
+                        "dur_ms": duration_ns / 1e6,
+                        "thread": thread_name,
+                        "args": args,
+                    }) + "\n")
+                f.write(json.dumps({"type": "summary", "counters": self.counters,
+                                    "spans": self.summary()}) + "\n")
+        print(f"Performance trace written to {path}")
+        return path
+
+# Process-wide tracer used by the app and utilities
+tracer = Tracer()
+span = tracer.span
+count = tracer.count
+record = tracer.record
+log = tracer.log
+
+if os.environ.get(TRACE_ENV):
+    tracer.enable(os.environ[TRACE_ENV])
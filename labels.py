@@ -0,0 +1,37 @@
+import os
+from utils import read_metadata
+
+# Emotions offered when recording an entry -> the model's class folder names.
+# Emotions without a close counterpart ("Other") are not used as labels.
+JOURNAL_TO_CLASS = {
+    "Happy": "happy",
+    "Grateful": "happy",
+    "Sad": "sad",
+    "Anxious": "fear",
+    "Calm": "neutral",
+    "Angry": "angry",
+    "Confused": "surprise",
+}
+
+# The FER-style classes the model is trained on, in flow_from_directory order
+DEFAULT_CLASSES = ["angry", "disgust", "fear", "happy", "neutral", "sad", "surprise"]
+
+def model_classes(train_dir="dataset/train"):
+    """Return the class names in the order the model's outputs use."""
+    if os.path.isdir(train_dir):
+        # flow_from_directory assigns indices to the sorted subdirectory names
+        return sorted(d for d in os.listdir(train_dir) if os.path.isdir(os.path.join(train_dir, d)))
+    return list(DEFAULT_CLASSES)
+
+def labeled_entries(videos_dir, classes):
+    """Yield (base, video_path, class_index) for saved entries whose emotion maps to a class."""
+    for name in sorted(os.listdir(videos_dir)):
+        if not name.endswith(".mp4") or name.startswith("."):
+            continue
+        base = name[:-len(".mp4")]
+        metadata_file = os.path.join(videos_dir, f"{base}.txt")
+        if not os.path.exists(metadata_file):
+            continue
+        label = JOURNAL_TO_CLASS.get(read_metadata(metadata_file, body=False)["emotion"])
+        if label in classes:
+            yield base, os.path.join(videos_dir, name), classes.index(label)
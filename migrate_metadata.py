@@ -0,0 +1,56 @@
+import argparse
+import os
+from utils import read_metadata, metadata_version, format_metadata, METADATA_VERSION
+
+videos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
+
+def migrate_file(metadata_file):
+    """Rewrite one sidecar in the current format; returns True if it was converted."""
+    if metadata_version(metadata_file) >= METADATA_VERSION:
+        return False
+
+    entry = read_metadata(metadata_file)
+    stat = os.stat(metadata_file)
+    directory, name = os.path.split(metadata_file)
+    tmp_path = os.path.join(directory, f".{name}.migrate")
+    with open(tmp_path, "wb") as f:
+        f.write(format_metadata(entry["title"], entry["date"], entry["emotion"], entry["journal_content"]))
+        f.flush()
+        os.fsync(f.fileno())
+    # Keep the modification time: the content is unchanged and it dates entries that had no Date line
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, metadata_file)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert journal sidecars from the Title:/Date:/Emotion: '
+                                                 'text format to the versioned header format')
+    parser.add_argument('--videos', type=str, default=videos_dir, help='Journal videos directory')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the files that would be converted')
+    args = parser.parse_args()
+
+    converted = skipped = failed = 0
+    for name in sorted(os.listdir(args.videos)):
+        if not name.endswith(".txt") or name.startswith("."):
+            continue
+        path = os.path.join(args.videos, name)
+        try:
+            if args.dry_run:
+                if metadata_version(path) < METADATA_VERSION:
+                    print(f"  {name}")
+                    converted += 1
+                else:
+                    skipped += 1
+            elif migrate_file(path):
+                converted += 1
+            else:
+                skipped += 1
+        except (OSError, ValueError) as e:
+            print(f"{name}: {str(e)}")
+            failed += 1
+
+    action = "to convert" if args.dry_run else "converted"
+    print(f"{converted} sidecars {action}, {skipped} already current, {failed} failed")
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,125 @@
+import argparse
 import tensorflow as tf
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+from tensorflow.keras.layers import (Conv2D, MaxPooling2D, Flatten, Dense, Dropout,
+                                     SeparableConv2D, BatchNormalization, GlobalAveragePooling2D, Activation)
 import matplotlib.pyplot as plt
 
 # Image Dimensions & Paths
 img_size = (48, 48)
 batch_size = 32
-train_dir = "dataset/train"   
+train_dir = "dataset/train"
 test_dir = "dataset/test"
 
-# Data Augmentation & Preprocessing
-train_datagen = ImageDataGenerator(
-    rescale=1./255, rotation_range=30, width_shift_range=0.2, 
-    height_shift_range=0.2, shear_range=0.2, zoom_range=0.2, 
-    horizontal_flip=True, fill_mode='nearest'
-)
-
-test_datagen = ImageDataGenerator(rescale=1./255)
-
-train_generator = train_datagen.flow_from_directory(
-    train_dir, target_size=img_size, batch_size=batch_size, class_mode='categorical'
-)
-
-test_generator = test_datagen.flow_from_directory(
-    test_dir, target_size=img_size, batch_size=batch_size, class_mode='categorical'
-)
-
-# Build CNN Model
-model = Sequential([
-    Conv2D(32, (3,3), activation='relu', input_shape=(48, 48, 3)),
-    MaxPooling2D(2,2),
-    Conv2D(64, (3,3), activation='relu'),
-    MaxPooling2D(2,2),
-    Conv2D(128, (3,3), activation='relu'),
-    MaxPooling2D(2,2),
-    Flatten(),
-    Dense(128, activation='relu'),
-    Dropout(0.5),
-    Dense(7, activation='softmax')  # 7 emotion classes
-])
-
-# Compile Model
-model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
-
-# Train Model
-history = model.fit(train_generator, validation_data=test_generator, epochs=20)
-
-# Save Model
-model.save("emotion_model.h5")
-
-# Plot Accuracy & Loss
-plt.figure(figsize=(10,4))
-plt.subplot(1,2,1)
-plt.plot(history.history['accuracy'], label='Train Accuracy')
-plt.plot(history.history['val_accuracy'], label='Test Accuracy')
-plt.legend()
-plt.title('Accuracy')
-
-plt.subplot(1,2,2)
-plt.plot(history.history['loss'], label='Train Loss')
-plt.plot(history.history['val_loss'], label='Test Loss')
-plt.legend()
-plt.title('Loss')
-plt.show()
+# Input channels -> Keras color_mode. Facial-expression data is effectively
+# grayscale, so the 1-channel variant loses little and is cheaper to run.
+COLOR_MODES = {3: "rgb", 1: "grayscale"}
+
+def make_generators(train_dir=train_dir, test_dir=test_dir, batch_size=batch_size, channels=3):
+    """Create the augmented training and rescaled test generators."""
+    # Data Augmentation & Preprocessing
+    train_datagen = ImageDataGenerator(
+        rescale=1./255, rotation_range=30, width_shift_range=0.2,
+        height_shift_range=0.2, shear_range=0.2, zoom_range=0.2,
+        horizontal_flip=True, fill_mode='nearest'
+    )
+
+    test_datagen = ImageDataGenerator(rescale=1./255)
+
+    train_generator = train_datagen.flow_from_directory(
+        train_dir, target_size=img_size, batch_size=batch_size, class_mode='categorical',
+        color_mode=COLOR_MODES[channels]
+    )
+
+    test_generator = test_datagen.flow_from_directory(
+        test_dir, target_size=img_size, batch_size=batch_size, class_mode='categorical',
+        color_mode=COLOR_MODES[channels]
+    )
+    return train_generator, test_generator
+
+def build_model(num_classes=7, channels=3, jit_compile=False, learning_rate=0.001, dropout=0.5):
+    """Build and compile the emotion CNN for 3-channel (RGB) or 1-channel (grayscale) input.
+
+    jit_compile=True has Keras compile the train and predict steps with XLA.
+    """
+    model = Sequential([
+        Conv2D(32, (3,3), activation='relu', input_shape=(48, 48, channels)),
+        MaxPooling2D(2,2),
+        Conv2D(64, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+        Conv2D(128, (3,3), activation='relu'),
+        MaxPooling2D(2,2),
+        Flatten(),
+        Dense(128, activation='relu'),
+        Dropout(dropout),
+        Dense(num_classes, activation='softmax')  # 7 emotion classes
+    ])
+
+    # Compile Model
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate), loss='categorical_crossentropy',
+                  metrics=['accuracy'], jit_compile=jit_compile)
+    return model
+
+def build_student(num_classes=7, channels=3, width=0.5):
+    """Build a compact depthwise-separable CNN to be trained by distill.py.
+
+    width scales every layer's filter count. The softmax is a separate last
+    layer so distillation can train on the logits of the layer before it.
+    """
+    filters = [max(8, int(f * width)) for f in (32, 64, 128)]
+    model = Sequential([
+        Conv2D(filters[0], (3,3), activation='relu', padding='same', input_shape=(48, 48, channels)),
+        MaxPooling2D(2,2),
+        SeparableConv2D(filters[1], (3,3), padding='same', use_bias=False),
+        BatchNormalization(),
+        Activation('relu'),
+        MaxPooling2D(2,2),
+        SeparableConv2D(filters[2], (3,3), padding='same', use_bias=False),
+        BatchNormalization(),
+        Activation('relu'),
+        GlobalAveragePooling2D(),
+        Dropout(0.3),
+        Dense(num_classes),
+        Activation('softmax')
+    ])
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+def plot_history(history):
+    """Plot accuracy and loss curves from a Keras History object."""
+    plt.figure(figsize=(10,4))
+    plt.subplot(1,2,1)
+    plt.plot(history.history['accuracy'], label='Train Accuracy')
+    plt.plot(history.history['val_accuracy'], label='Test Accuracy')
+    plt.legend()
+    plt.title('Accuracy')
+
+    plt.subplot(1,2,2)
+    plt.plot(history.history['loss'], label='Train Loss')
+    plt.plot(history.history['val_loss'], label='Test Loss')
+    plt.legend()
+    plt.title('Loss')
+    plt.show()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the emotion CNN')
+    parser.add_argument('--channels', type=int, choices=sorted(COLOR_MODES), default=3,
+                        help='Input channels: 3 for RGB, 1 for grayscale (default: 3)')
+    parser.add_argument('--output', type=str, default="emotion_model.h5", help='Where to save the trained model')
+    parser.add_argument('--jit', action='store_true', help='Compile the training step with XLA')
+    args = parser.parse_args()
+
+    train_generator, test_generator = make_generators(channels=args.channels)
+
+    # Build CNN Model
+    model = build_model(channels=args.channels, jit_compile=args.jit)
+
+    # Train Model
+    history = model.fit(train_generator, validation_data=test_generator, epochs=20)
+
+    # Save Model
+    model.save(args.output)
+
+    # Plot Accuracy & Loss
+    plot_history(history)
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import tensorflow as tf
+from cache import file_hash
+from faces import FaceDetector, iter_video_faces
+from labels import model_classes, labeled_entries, JOURNAL_TO_CLASS
+from utils import ensure_dir
+
+model_path = "emotion_model.h5"
+output_path = "emotion_model_personal.h5"
+videos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "embeddings")
+
+# Bump when face sampling or cropping changes so cached embeddings are recomputed
+EMBEDDING_VERSION = "haar-48-area-rescale255-v1"
+
+def split_model(model):
+    """Split the CNN at its Flatten layer into (trunk, head layers)."""
+    names = [layer.__class__.__name__ for layer in model.layers]
+    flatten = names.index("Flatten")
+    trunk = tf.keras.Model(model.inputs, model.layers[flatten].output)
+    return trunk, model.layers[flatten + 1:]
+
+def build_head(head_layers, embedding_size):
+    """A standalone copy of the dense head, starting from the trained weights."""
+    head = tf.keras.Sequential([tf.keras.Input((embedding_size,))]
+                               + [layer.__class__.from_config(layer.get_config()) for layer in head_layers])
+    for copy, layer in zip(head.layers, head_layers):
+        copy.set_weights(layer.get_weights())
+    head.compile(optimizer=tf.keras.optimizers.Adam(1e-4), loss='categorical_crossentropy', metrics=['accuracy'])
+    return head
+
+class EmbeddingCache:
+    """Trunk embeddings of the face crops in each journal video, stored once per video.
+
+    Entries are keyed by the video's size and modification time, so a rerun
+    only decodes and embeds videos saved (or re-encoded) since the last one.
+    Labels are refreshed from the sidecars every run, since editing an
+    entry's emotion does not change its video.
+    """
+
+    def __init__(self, model_path, cache_dir=CACHE_DIR):
+        self.directory = os.path.join(cache_dir, f"{file_hash(model_path)[:16]}-{EMBEDDING_VERSION}")
+        ensure_dir(self.directory)
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+
+    def save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def update(self, entries, trunk, detector, interval, batch_size=64, prune=True):
+        """Embed new or changed videos and forget deleted ones; returns the number embedded.
+
+        With prune=False entries missing from `entries` are kept, so a single
+        newly saved entry can be added on its own.
+        """
+        channels = trunk.input_shape[-1]
+        seen = set()
+        embedded = 0
+        for base, video_path, label in entries:
+            seen.add(base)
+            stat = os.stat(video_path)
+            known = self.index.get(base)
+            if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size:
+                known["label"] = label
+                continue
+
+            crops = [face for _, face in iter_video_faces(video_path, detector, interval, channels=channels)]
+            if crops:
+                images = np.stack(crops).astype(np.float32) / 255.0
+                vectors = trunk.predict(images, batch_size=batch_size, verbose=0)
+                np.save(os.path.join(self.directory, f"{base}.npy"), vectors.astype(np.float16))
+            self.index[base] = {"mtime": stat.st_mtime, "size": stat.st_size, "label": label, "count": len(crops)}
+            embedded += 1
+            print(f"{base}: {len(crops)} faces")
+
+        for base in [b for b in self.index if prune and b not in seen]:
+            path = os.path.join(self.directory, f"{base}.npy")
+            if os.path.exists(path):
+                os.remove(path)
+            del self.index[base]
+        self.save()
+        return embedded
+
+    def dataset(self, num_classes):
+        """Return (embeddings, one-hot labels) for every cached face."""
+        vectors, labels = [], []
+        for base, info in self.index.items():
+            if info["count"] == 0:
+                continue
+            data = np.load(os.path.join(self.directory, f"{base}.npy")).astype(np.float32)
+            vectors.append(data)
+            labels.append(np.full(len(data), info["label"]))
+        if not vectors:
+            return None, None
+        return np.concatenate(vectors), tf.keras.utils.to_categorical(np.concatenate(labels), num_classes)
+
+def train_head(head_layers, x, y, epochs=30, batch_size=64, verbose=2):
+    """Fit a copy of the dense head on cached embeddings."""
+    order = np.random.default_rng(0).permutation(len(x))
+    head = build_head(head_layers, x.shape[1])
+    callbacks = [tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)]
+    head.fit(x[order], y[order], validation_split=0.2 if len(x) >= 20 else 0.0, epochs=epochs,
+             batch_size=batch_size, callbacks=callbacks if len(x) >= 20 else [], verbose=verbose)
+    return head
+
+def save_personal_model(model, head, output):
+    """Put a trained head back on a copy of the original trunk and save it."""
+    personal = tf.keras.models.clone_model(model)
+    personal.set_weights(model.get_weights())
+    _, personal_head = split_model(personal)
+    for target, trained in zip(personal_head, head.layers):
+        target.set_weights(trained.get_weights())
+    personal.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    # The app may load the personalised model at any time; never expose a half-written file
+    tmp_path = output[:-len(".h5")] + ".tmp.h5"
+    personal.save(tmp_path)
+    os.replace(tmp_path, output)
+
+class Personalizer:
+    """Updates the personalised model incrementally as journal entries are saved.
+
+    Registered as a save-queue commit hook. Each committed entry is embedded
+    on its own through the embedding cache, then the small dense head is
+    refitted on all cached embeddings. Each save costs one video's face pass
+    and a few seconds of head training instead of a full rebuild. The work
+    runs on its own thread so it never holds up the next save, and the
+    model is loaded on first use.
+    """
+
+    def __init__(self, model_path=model_path, output=output_path, classes_dir="dataset/train",
+                 interval=1.0, epochs=30, batch_size=64):
+        self.model_path = model_path
+        self.output = output
+        self.classes = model_classes(classes_dir)
+        self.interval = interval
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.model = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="personalize")
+
+    def __call__(self, job):
+        label = JOURNAL_TO_CLASS.get(job.emotion)
+        if label in self.classes:
+            self._executor.submit(self._update, job.base, job.video_path, self.classes.index(label))
+
+    def _update(self, base, video_path, label):
+        try:
+            with self._lock:
+                start = time.perf_counter()
+                if self.model is None:
+                    self.model = tf.keras.models.load_model(self.model_path)
+                    self.trunk, self.head_layers = split_model(self.model)
+                    self.cache = EmbeddingCache(self.model_path)
+                    self.detector = FaceDetector()
+                self.cache.update([(base, video_path, label)], self.trunk, self.detector, self.interval,
+                                  prune=False)
+                x, y = self.cache.dataset(len(self.classes))
+                if x is None:
+                    return
+                head = train_head(self.head_layers, x, y, self.epochs, self.batch_size, verbose=0)
+                save_personal_model(self.model, head, self.output)
+                print(f"Personalised model updated with {base} in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            print(f"Could not personalise the model with {base}: {str(e)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Fine-tune the emotion model head on faces from saved journal entries')
+    parser.add_argument('--model', type=str, default=model_path, help='Trained base model')
+    parser.add_argument('--output', type=str, default=output_path, help='Where to save the personalised model')
+    parser.add_argument('--videos', type=str, default=videos_dir, help='Journal videos directory')
+    parser.add_argument('--classes-dir', type=str, default="dataset/train",
+                        help='Training directory whose subfolders name the model classes')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between sampled frames (default: 1)')
+    parser.add_argument('--epochs', type=int, default=30, help='Head training epochs (default: 30)')
+    parser.add_argument('--batch-size', type=int, default=64, help='Head training batch size (default: 64)')
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    classes = model_classes(args.classes_dir)
+    if len(classes) != model.output_shape[-1]:
+        parser.error(f"{len(classes)} classes found but the model has {model.output_shape[-1]} outputs")
+    trunk, head_layers = split_model(model)
+
+    start = time.perf_counter()
+    cache = EmbeddingCache(args.model)
+    embedded = cache.update(labeled_entries(args.videos, classes), trunk, FaceDetector(), args.interval)
+    print(f"Embedded {embedded} new or changed videos in {time.perf_counter() - start:.1f}s "
+          f"({len(cache.index)} cached)")
+
+    x, y = cache.dataset(len(classes))
+    if x is None:
+        print("No labelled faces found in the journal entries")
+        return
+
+    start = time.perf_counter()
+    head = train_head(head_layers, x, y, args.epochs, args.batch_size)
+    print(f"Trained head on {len(x)} faces in {time.perf_counter() - start:.1f}s")
+
+    save_personal_model(model, head, args.output)
+    print(f"Personalised model saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
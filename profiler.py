@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from utils import ensure_dir, get_timestamp
+
+# Where profiles are written unless a directory is given
+DIAGNOSTICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diagnostics")
+
+class SamplingProfiler:
+    """Periodically samples the stacks of all Python threads.
+
+    Samples are aggregated as collapsed stacks ("thread;outer;...;inner count"),
+    the input format of flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, interval=0.005, output_dir=DIAGNOSTICS_DIR):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start sampling in a background daemon thread."""
+        if self.running:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and write the collapsed stacks; returns the output path."""
+        if not self.running:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return self.dump()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+    def dump(self, path=None):
+        """Write collapsed stacks to `path` (default: diagnostics/profile_<timestamp>.folded)."""
+        if path is None:
+            ensure_dir(self.output_dir)
+            path = os.path.join(self.output_dir, f"profile_{get_timestamp()}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        duration = time.perf_counter() - self.started if self.started else 0
+        print(f"Profile written to {path} ({self.samples} samples over {duration:.1f}s)")
+        return path
@@ -0,0 +1,138 @@
+import datetime
+import json
+import os
+import threading
+
+ROLLUPS_NAME = ".rollups.json"
+ROLLUPS_VERSION = 1
+
+def day_key(date):
+    """Return the YYYY-MM-DD day of an entry date string, or None if it has no usable date."""
+    day = (date or "")[:10]
+    try:
+        datetime.datetime.strptime(day, "%Y-%m-%d")
+    except ValueError:
+        return None
+    return day
+
+def week_key(day):
+    """Return the ISO week ("2024-W07") a YYYY-MM-DD day falls in."""
+    year, week, _ = datetime.date.fromisoformat(day).isocalendar()
+    return f"{year}-W{week:02d}"
+
+def _bump(counts, key, emotion, delta):
+    bucket = counts.setdefault(key, {})
+    bucket[emotion] = bucket.get(emotion, 0) + delta
+    if bucket[emotion] <= 0:
+        del bucket[emotion]
+        if not bucket:
+            del counts[key]
+
+class EmotionRollups:
+    """Daily and weekly emotion counts, maintained as entries are saved and deleted.
+
+    Only the (day, emotion) of each entry is remembered, so a save or delete
+    adjusts a few counters instead of re-reading every sidecar, and the
+    dashboard is drawn from the stored counts alone.
+    """
+
+    def __init__(self, videos_dir, path=None):
+        self.path = path or os.path.join(videos_dir, ROLLUPS_NAME)
+        self.entries = {}  # base -> [day or None, emotion]
+        self.daily = {}    # day -> {emotion: count}
+        self.weekly = {}   # ISO week -> {emotion: count}
+        self.totals = {}   # emotion -> count
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != ROLLUPS_VERSION:
+                return
+            for base, (day, emotion) in data["entries"].items():
+                self._apply(base, day, emotion, 1)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Rollups unreadable, rebuilding: {str(e)}")
+            self.entries, self.daily, self.weekly, self.totals = {}, {}, {}, {}
+
+    def save(self):
+        """Write the rollups to disk atomically."""
+        with self._lock:
+            data = {"version": ROLLUPS_VERSION, "entries": self.entries}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+    def _apply(self, base, day, emotion, delta):
+        if delta > 0:
+            self.entries[base] = [day, emotion]
+        else:
+            self.entries.pop(base, None)
+        self.totals[emotion] = self.totals.get(emotion, 0) + delta
+        if self.totals[emotion] <= 0:
+            del self.totals[emotion]
+        if day:
+            _bump(self.daily, day, emotion, delta)
+            _bump(self.weekly, week_key(day), emotion, delta)
+
+    def add(self, base, date, emotion):
+        """Count an entry (replacing its previous counts if it was already known)."""
+        with self._lock:
+            self.remove(base)
+            self._apply(base, day_key(date), emotion, 1)
+
+    def remove(self, base):
+        """Stop counting a deleted entry."""
+        with self._lock:
+            known = self.entries.get(base)
+            if known is not None:
+                self._apply(base, known[0], known[1], -1)
+
+    def sync(self, docs):
+        """Reconcile with the search index's entries; returns True if anything changed.
+
+        Only entries whose day or emotion differ are touched, so this is cheap
+        when the rollups are already current.
+        """
+        changed = False
+        with self._lock:
+            for base in [b for b in self.entries if b not in docs]:
+                self.remove(base)
+                changed = True
+            for base, doc in docs.items():
+                if self.entries.get(base) != [day_key(doc["date"]), doc["emotion"]]:
+                    self.add(base, doc["date"], doc["emotion"])
+                    changed = True
+        return changed
+
+    def recent_weeks(self, count=12, today=None):
+        """Return [(week, {emotion: count})] for the last `count` ISO weeks, oldest first."""
+        today = today or datetime.date.today()
+        with self._lock:
+            weeks = []
+            for i in range(count - 1, -1, -1):
+                week = week_key((today - datetime.timedelta(weeks=i)).isoformat())
+                weeks.append((week, dict(self.weekly.get(week, {}))))
+            return weeks
+
+    def streaks(self, today=None):
+        """Return (current, longest) runs of consecutive days with at least one entry.
+
+        The current streak still counts if the latest entry was yesterday.
+        """
+        today = today or datetime.date.today()
+        with self._lock:
+            days = sorted(datetime.date.fromisoformat(d) for d in self.daily)
+        longest = run = 0
+        previous = None
+        for day in days:
+            run = run + 1 if previous and (day - previous).days == 1 else 1
+            longest = max(longest, run)
+            previous = day
+        current = run if previous and (today - previous).days <= 1 else 0
+        return current, longest
@@ -0,0 +1,235 @@
+import datetime
+import itertools
+import os
+import queue
+import threading
+import time
+import instrument
+from utils import save_video, SaveCancelled, format_metadata, DATE_FORMAT
+
+# Number of journal entries encoded at the same time; set EJ_SAVE_WORKERS to change it
+SAVE_WORKERS_ENV = "EJ_SAVE_WORKERS"
+SAVE_CONCURRENCY = 1
+
+# Saves allowed to wait behind the running ones. Every job holds its recording's
+# raw frames, so this bounds the memory tied up in unsaved entries.
+MAX_QUEUED_SAVES = 2
+
+# Marker in the names of files that are still being written
+TEMP_MARKER = ".saving"
+
+def fsync_file(path):
+    """Flush a file's contents to disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def fsync_dir(directory):
+    """Flush directory entries (renames) to disk where the platform allows it."""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def save_concurrency():
+    """Return the number of save workers, from $EJ_SAVE_WORKERS or the default."""
+    try:
+        return max(1, int(os.environ.get(SAVE_WORKERS_ENV, SAVE_CONCURRENCY)))
+    except ValueError:
+        print(f"Ignoring invalid {SAVE_WORKERS_ENV}, using {SAVE_CONCURRENCY}")
+        return SAVE_CONCURRENCY
+
+def safe_basename(title):
+    """Turn an entry title into a file name base the way the app always has."""
+    base = title.strip().replace(" ", "_")
+    for char in '/\\:*?"<>|':
+        base = base.replace(char, "_")
+    return base or "Untitled"
+
+class SaveJob:
+    """A journal entry waiting to be (or being) written to disk.
+
+    The form values are captured when the job is created so the worker
+    thread never touches Tk widgets. The worker updates `state`,
+    `written`, `total` and `encode_fps`; the GUI reads them to show progress and
+    sets `cancel` to abandon the save.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, title, emotion, journal_text, frames, fps=20, profile=None, timestamps=None):
+        self.id = next(self._ids)
+        self.title = title
+        self.emotion = emotion
+        self.journal_text = journal_text
+        self.frames = frames
+        self.fps = fps
+        self.profile = profile
+        # Capture times of a motion-gated recording (see utils.save_video)
+        self.timestamps = timestamps
+        self.date = datetime.datetime.now().strftime(DATE_FORMAT)
+        self.base = None
+        self.state = "queued"
+        self.cancel = threading.Event()
+        self.started = None
+        self.first_written = 0
+        self.written = 0
+        self.total = len(frames)
+        self.encode_fps = 0.0
+        self.video_path = None
+        self.metadata_path = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed", "cancelled")
+
+    @property
+    def eta(self):
+        """Estimated seconds of encoding left, or None before the rate is known."""
+        if not self.encode_fps:
+            return None
+        return (self.total - self.written) / self.encode_fps
+
+    def on_progress(self, written, total):
+        now = time.perf_counter()
+        if self.started is None:
+            # Measure from the first report so encoder start-up is not counted
+            self.started = now
+            self.first_written = written
+        elif now > self.started:
+            self.encode_fps = (written - self.first_written) / (now - self.started)
+        self.written = written
+        self.total = total
+
+class SaveQueue:
+    """Saves journal entries on a fixed pool of worker threads.
+
+    Each entry's video and sidecar are written to hidden temporary files,
+    fsynced, and then renamed into place: sidecar first, video last, so an
+    entry only appears in the history (which lists .mp4 files) once both
+    are complete. File names are reserved under a lock, so two saves with
+    the same title get distinct names instead of overwriting each other.
+    At most max_queued jobs wait behind the running ones; submit raises
+    queue.Full beyond that.
+    """
+
+    def __init__(self, videos_dir, concurrency=None, max_queued=MAX_QUEUED_SAVES):
+        self.videos_dir = videos_dir
+        self.concurrency = concurrency or save_concurrency()
+        self.jobs = queue.Queue(maxsize=max_queued)
+        self.commit_hooks = []  # called as hook(job) after an entry is committed
+        self._reserved = set()
+        self._lock = threading.Lock()
+        self._workers = []
+        self.pending = 0
+
+    def submit(self, job):
+        """Queue a job and start the workers on first use.
+
+        Raises queue.Full, without queueing the job, when max_queued saves are
+        already waiting.
+        """
+        with self._lock:
+            if not self._workers:
+                for i in range(self.concurrency):
+                    worker = threading.Thread(target=self._run, name=f"save-{i}", daemon=True)
+                    worker.start()
+                    self._workers.append(worker)
+            self.jobs.put_nowait(job)
+            self.pending += 1
+        return job
+
+    def _reserve(self, title):
+        base = safe_basename(title)
+        with self._lock:
+            candidate = base
+            for n in itertools.count(2):
+                taken = (candidate in self._reserved
+                         or os.path.exists(os.path.join(self.videos_dir, f"{candidate}.mp4"))
+                         or os.path.exists(os.path.join(self.videos_dir, f"{candidate}.txt")))
+                if not taken:
+                    break
+                candidate = f"{base}_{n}"
+            self._reserved.add(candidate)
+            return candidate
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job.cancel.is_set():
+                    raise SaveCancelled()
+                with instrument.span("save.total", frames=job.total):
+                    self._save(job)
+                job.state = "done"
+                for hook in self.commit_hooks:
+                    try:
+                        hook(job)
+                    except Exception as e:
+                        print(f"Save hook failed for {job.video_path}: {str(e)}")
+            except SaveCancelled:
+                job.frames = None
+                job.state = "cancelled"
+            except Exception as e:
+                print(f"Error saving video: {str(e)}")
+                job.error = str(e)
+                job.state = "failed"
+            finally:
+                with self._lock:
+                    self._reserved.discard(job.base)
+                    self.pending -= 1
+                self.jobs.task_done()
+
+    def _save(self, job):
+        job.base = self._reserve(job.title)
+        job.state = "encoding"
+        temp_base = os.path.join(self.videos_dir, f".{job.base}{TEMP_MARKER}")
+        temp_video = f"{temp_base}.mp4"
+        temp_metadata = f"{temp_base}.txt"
+        # Named after the entry (not the hidden temp file) so the user can find it
+        images_dir = os.path.join(self.videos_dir, f"images_{job.base}")
+        try:
+            saved_path = save_video(job.frames, fps=job.fps, output_path=temp_video,
+                                    profile=job.profile, progress=job.on_progress,
+                                    cancel=job.cancel, timestamps=job.timestamps,
+                                    images_dir=images_dir)
+            if not saved_path or not os.path.exists(saved_path):
+                if os.path.isdir(images_dir):
+                    raise RuntimeError(f"video encoder did not produce a file; key frames were kept in {images_dir}")
+                raise RuntimeError("video encoder did not produce a file")
+            job.frames = None  # free the raw frames as soon as they are encoded
+
+            job.state = "committing"
+            with open(temp_metadata, "wb") as f:
+                f.write(format_metadata(job.title, job.date, job.emotion, job.journal_text))
+                f.flush()
+                os.fsync(f.fileno())
+            fsync_file(temp_video)
+
+            video_path = os.path.join(self.videos_dir, f"{job.base}.mp4")
+            metadata_path = os.path.join(self.videos_dir, f"{job.base}.txt")
+            os.replace(temp_metadata, metadata_path)
+            os.replace(temp_video, video_path)  # the entry becomes visible here
+            fsync_dir(self.videos_dir)
+            job.video_path = video_path
+            job.metadata_path = metadata_path
+            print(f"Video saved successfully to {video_path}")
+        finally:
+            for path in (temp_video, temp_metadata):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def recover(self, min_age=3600):
+        """Delete temporary files left behind by saves interrupted by a crash."""
+        now = time.time()
+        for name in os.listdir(self.videos_dir):
+            path = os.path.join(self.videos_dir, name)
+            if name.startswith(".") and TEMP_MARKER in name and now - os.path.getmtime(path) > min_age:
+                print(f"Removing incomplete save {name}")
+                os.remove(path)
@@ -0,0 +1,231 @@
+import bisect
+import datetime
+import json
+import math
+import os
+import re
+import threading
+import instrument
+from utils import read_metadata, DATE_FORMAT
+
+INDEX_NAME = ".search_index.json"
+INDEX_VERSION = 2
+
+# Term weights per field; a title match counts three times a body match
+FIELD_WEIGHTS = {"title": 3.0, "emotion": 2.0, "body": 1.0}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """Split text into lower-case word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+class SearchIndex:
+    """Incremental inverted index over journal titles, text, emotion and date.
+
+    Each entry (keyed by its file base name) keeps its weighted term
+    frequencies so it can be removed or replaced without a rebuild. The
+    index is stored next to the videos and refreshed from the sidecars'
+    modification times, so only new or edited entries are re-read.
+    """
+
+    def __init__(self, videos_dir, index_path=None):
+        self.videos_dir = videos_dir
+        self.index_path = index_path or os.path.join(videos_dir, INDEX_NAME)
+        self.docs = {}      # base -> {"title", "emotion", "date", "preview", "mtime", "length", "terms"}
+        self.postings = {}  # term -> {base: weighted tf}
+        self.total_length = 0.0
+        self._vocabulary = None  # sorted terms for prefix search, rebuilt lazily
+        self._by_date = None     # sorted (date, base) pairs, rebuilt lazily
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                return
+            for base, doc in data["docs"].items():
+                self._add_doc(base, doc)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Search index unreadable, rebuilding: {str(e)}")
+            self.docs = {}
+            self.postings = {}
+            self.total_length = 0.0
+
+    def save(self):
+        """Write the index to disk atomically."""
+        with self._lock:
+            data = {"version": INDEX_VERSION, "docs": self.docs}
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+
+    def _add_doc(self, base, doc):
+        self.docs[base] = doc
+        for term, weight in doc["terms"].items():
+            self.postings.setdefault(term, {})[base] = weight
+        self.total_length += doc["length"]
+        self._vocabulary = None
+        self._by_date = None
+
+    def remove(self, base):
+        """Drop an entry from the index."""
+        with self._lock:
+            doc = self.docs.pop(base, None)
+            if doc is None:
+                return
+            for term in doc["terms"]:
+                entries = self.postings.get(term)
+                if entries is not None:
+                    entries.pop(base, None)
+                    if not entries:
+                        del self.postings[term]
+            self.total_length -= doc["length"]
+            self._vocabulary = None
+            self._by_date = None
+
+    def add(self, base, title, emotion, date, body, mtime=0):
+        """Index (or re-index) one entry."""
+        terms = {}
+        for field, text in (("title", title), ("emotion", emotion), ("body", body)):
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + FIELD_WEIGHTS[field]
+        doc = {
+            "title": title,
+            "emotion": emotion,
+            "date": date,
+            "preview": body[:150] + ("..." if len(body) > 150 else ""),
+            "mtime": mtime,
+            "length": sum(terms.values()),
+            "terms": terms,
+        }
+        with self._lock:
+            self.remove(base)
+            self._add_doc(base, doc)
+
+    def add_file(self, base):
+        """Index an entry from its files in the videos directory."""
+        metadata_file = os.path.join(self.videos_dir, f"{base}.txt")
+        metadata_mtime = 0
+        if os.path.exists(metadata_file):
+            metadata_mtime = os.path.getmtime(metadata_file)
+            try:
+                entry = read_metadata(metadata_file)
+                self.add(base, entry["title"], entry["emotion"], entry["date"],
+                         entry["journal_content"], metadata_mtime)
+                return
+            except (OSError, ValueError, KeyError) as e:
+                # A truncated or corrupt sidecar; keep the entry listed by its video.
+                # Its mtime is recorded, so it is re-read only once the file changes.
+                print(f"Could not read {metadata_file}: {str(e)}")
+        # Fallback if no metadata: date the entry by its video
+        mtime = os.path.getmtime(os.path.join(self.videos_dir, f"{base}.mp4"))
+        date = datetime.datetime.fromtimestamp(mtime).strftime(DATE_FORMAT)
+        self.add(base, base, "Not specified", date, "", metadata_mtime)
+
+    def refresh(self):
+        """Bring the index in line with the videos directory; returns True if anything changed."""
+        with instrument.span("search.refresh"):
+            names = os.listdir(self.videos_dir)
+            bases = {n[:-4] for n in names if n.endswith(".mp4") and not n.startswith(".")}
+            changed = False
+            with self._lock:
+                for base in list(self.docs):
+                    if base not in bases:
+                        self.remove(base)
+                        changed = True
+            for base in sorted(bases):
+                metadata_file = os.path.join(self.videos_dir, f"{base}.txt")
+                mtime = os.path.getmtime(metadata_file) if os.path.exists(metadata_file) else 0
+                doc = self.docs.get(base)
+                if doc is None or doc["mtime"] != mtime:
+                    self.add_file(base)
+                    changed = True
+            if changed:
+                self.save()
+            return changed
+
+    def _expand(self, token, prefix):
+        """Return the indexed terms a query token matches."""
+        if not prefix:
+            return [token] if token in self.postings else []
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, token)
+        matches = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query="", emotion=None, date_from=None, date_to=None):
+        """Return matching entry bases, best match first.
+
+        The last query word also matches as a prefix, so results update as
+        the user types. Without a query, entries are ordered newest first.
+        date_from/date_to are inclusive "YYYY-MM-DD" strings.
+        """
+        with self._lock, instrument.span("search.query"):
+            if self._by_date is None:
+                self._by_date = sorted((doc["date"], base) for base, doc in self.docs.items())
+
+            # Date facet: a contiguous slice of the date-sorted list (undated entries sort first)
+            lo = bisect.bisect_left(self._by_date, (date_from or "0",)) if date_from or date_to else 0
+            hi = bisect.bisect_right(self._by_date, (date_to + "\uffff",)) if date_to else len(self._by_date)
+            candidates = self._by_date[lo:hi]
+            if emotion:
+                candidates = [(d, b) for d, b in candidates if self.docs[b]["emotion"] == emotion]
+
+            tokens = tokenize(query)
+            if not tokens:
+                return [b for _, b in reversed(candidates)]
+
+            allowed = {b for _, b in candidates}
+            scores = {}
+            count = len(self.docs)
+            avg_length = self.total_length / count if count else 1.0
+            for i, token in enumerate(tokens):
+                matched = {}
+                for term in self._expand(token, prefix=(i == len(tokens) - 1)):
+                    postings = self.postings[term]
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for base, tf in postings.items():
+                        if base not in allowed:
+                            continue
+                        length = self.docs[base]["length"]
+                        score = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+                        matched[base] = max(matched.get(base, 0.0), score)
+                # Every query word must match (AND semantics)
+                if i == 0:
+                    scores = matched
+                else:
+                    scores = {b: s + matched[b] for b, s in scores.items() if b in matched}
+                if not scores:
+                    return []
+
+            return sorted(scores, key=lambda b: -scores[b])
+
+    def emotions(self):
+        """Return the distinct emotions of indexed entries, for the emotion filter."""
+        with self._lock:
+            return sorted({doc["emotion"] for doc in self.docs.values()})
+
+    def facet_counts(self, bases):
+        """Count entries per emotion among the given results."""
+        counts = {}
+        with self._lock:
+            for base in bases:
+                doc = self.docs.get(base)
+                if doc is not None:
+                    counts[doc["emotion"]] = counts.get(doc["emotion"], 0) + 1
+        return counts
@@ -0,0 +1,167 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sweep_dir = "sweeps/default"
+
+# Trials always get this many epochs before the median rule may stop them
+MIN_EPOCHS = 3
+
+def trial_id(config):
+    return f"lr{config['learning_rate']:g}_bs{config['batch_size']}_do{config['dropout']:g}"
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_state(trial_dir):
+    path = os.path.join(trial_dir, "state.json")
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return None
+
+def others_at_epoch(sweep_path, own_id, epoch):
+    """Best validation accuracy up to `epoch` for every other trial that got that far."""
+    scores = []
+    for name in os.listdir(sweep_path):
+        state = load_state(os.path.join(sweep_path, name))
+        if name == own_id or state is None or len(state["val_accuracy"]) <= epoch:
+            continue
+        scores.append(max(state["val_accuracy"][:epoch + 1]))
+    return scores
+
+def run_trial(config, sweep_path, epochs, patience, channels, threads):
+    """Train one configuration, resuming from its last checkpoint if it was interrupted."""
+    import numpy as np
+    import tensorflow as tf
+    from model import make_generators, build_model
+
+    # Cap each trial so concurrent trials share the cores instead of oversubscribing them
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    name = trial_id(config)
+    trial_dir = os.path.join(sweep_path, name)
+    os.makedirs(trial_dir, exist_ok=True)
+    state = load_state(trial_dir) or {"id": name, "config": config, "status": "running",
+                                      "val_accuracy": [], "val_loss": [], "seconds": 0.0}
+    if state["status"] in ("done", "stopped"):
+        return state
+
+    last_path = os.path.join(trial_dir, "last.h5")
+    best_path = os.path.join(trial_dir, "best.h5")
+    train_generator, test_generator = make_generators(batch_size=config["batch_size"], channels=channels)
+    if state["val_accuracy"] and os.path.exists(last_path):
+        model = tf.keras.models.load_model(last_path)  # includes the optimizer state
+        print(f"{name}: resuming after epoch {len(state['val_accuracy'])}")
+    else:
+        state["val_accuracy"], state["val_loss"] = [], []
+        model = build_model(num_classes=train_generator.num_classes, channels=channels,
+                            learning_rate=config["learning_rate"], dropout=config["dropout"])
+
+    class SweepCallback(tf.keras.callbacks.Callback):
+        """Checkpoint every epoch and stop trials that are losing to the others."""
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self.start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            accuracy = float(logs["val_accuracy"])
+            if not state["val_accuracy"] or accuracy > max(state["val_accuracy"]):
+                self.model.save(best_path)
+            state["val_accuracy"].append(accuracy)
+            state["val_loss"].append(float(logs["val_loss"]))
+            state["seconds"] += time.perf_counter() - self.start
+            self.model.save(last_path)
+
+            best = max(state["val_accuracy"])
+            best_epoch = int(np.argmax(state["val_accuracy"]))
+            if epoch + 1 >= MIN_EPOCHS:
+                # Median stopping rule: quit if worse than the median of other trials at this epoch
+                others = others_at_epoch(sweep_path, name, epoch)
+                if others and best < float(np.median(others)):
+                    state["status"] = "stopped"
+                    self.model.stop_training = True
+            if epoch - best_epoch >= patience:
+                state["status"] = "done"
+                self.model.stop_training = True
+            _write_json(os.path.join(trial_dir, "state.json"), state)
+
+    model.fit(train_generator, validation_data=test_generator, epochs=epochs,
+              initial_epoch=len(state["val_accuracy"]), callbacks=[SweepCallback()], verbose=0)
+    if state["status"] == "running":
+        state["status"] = "done"
+    # Only the best checkpoint is kept for finished trials
+    if os.path.exists(last_path):
+        os.remove(last_path)
+    _write_json(os.path.join(trial_dir, "state.json"), state)
+    return state
+
+def results_table(states):
+    rows = []
+    for state in states:
+        history = state["val_accuracy"]
+        rows.append({
+            "id": state["id"],
+            **state["config"],
+            "best_val_accuracy": max(history) if history else 0.0,
+            "best_epoch": history.index(max(history)) + 1 if history else 0,
+            "epochs": len(history),
+            "status": state["status"],
+            "seconds": round(state["seconds"], 1),
+        })
+    return sorted(rows, key=lambda r: -r["best_val_accuracy"])
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a parallel hyperparameter sweep for the emotion CNN')
+    parser.add_argument('--learning-rates', type=float, nargs='+', default=[1e-3, 3e-4])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 64])
+    parser.add_argument('--dropouts', type=float, nargs='+', default=[0.3, 0.5])
+    parser.add_argument('--epochs', type=int, default=20, help='Maximum epochs per trial (default: 20)')
+    parser.add_argument('--patience', type=int, default=4,
+                        help='Finish a trial after this many epochs without improvement (default: 4)')
+    parser.add_argument('--channels', type=int, choices=[1, 3], default=3, help='Model input channels')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help='Trials trained at the same time (default: half the CPU cores)')
+    parser.add_argument('--sweep-dir', type=str, default=sweep_dir,
+                        help='Checkpoints and state; rerun with the same directory to resume')
+    args = parser.parse_args()
+
+    os.makedirs(args.sweep_dir, exist_ok=True)
+    configs = [{"learning_rate": lr, "batch_size": bs, "dropout": do}
+               for lr, bs, do in itertools.product(args.learning_rates, args.batch_sizes, args.dropouts)]
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    print(f"{len(configs)} trials, {args.workers} at a time with {threads} threads each")
+
+    states = []
+    # spawn: TensorFlow must not be inherited from a forked parent
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        futures = [pool.submit(run_trial, config, args.sweep_dir, args.epochs, args.patience,
+                               args.channels, threads) for config in configs]
+        for future in as_completed(futures):
+            state = future.result()
+            states.append(state)
+            history = state["val_accuracy"]
+            print(f"{state['id']}: {state['status']} after {len(history)} epochs, "
+                  f"best val_accuracy {max(history) if history else 0.0:.4f}")
+
+    rows = results_table(states)
+    with open(os.path.join(args.sweep_dir, "results.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+    print(f"\n{'trial':28} {'val_acc':>8} {'best_ep':>8} {'epochs':>7} {'status':>8} {'seconds':>8}")
+    for row in rows:
+        print(f"{row['id']:28} {row['best_val_accuracy']:8.4f} {row['best_epoch']:8d} {row['epochs']:7d} "
+              f"{row['status']:>8} {row['seconds']:8.1f}")
+    if rows:
+        print(f"Best checkpoint: {os.path.join(args.sweep_dir, rows[0]['id'], 'best.h5')}")
+
+if __name__ == "__main__":
+    main()
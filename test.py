@@ -1,45 +1,245 @@
+import argparse
+import datetime
+import json
+import os
+import time
 import tensorflow as tf
 import numpy as np
 import matplotlib.pyplot as plt
 from tensorflow.keras.preprocessing.image import ImageDataGenerator, load_img, img_to_array
-
-# Load Trained Model
-model = tf.keras.models.load_model("emotion_model.h5")
+from cache import PredictionCache, file_hash
+from evaluation import EvaluationAccumulator
+from model import COLOR_MODES
+from extract import read_manifest
 
 # Image Dimensions & Paths
 img_size = (48, 48)
+model_path = "emotion_model.h5"
 test_dir = "dataset/test"  # Ensure this directory contains test images
 
-# Data Preprocessing for Testing
-test_datagen = ImageDataGenerator(rescale=1./255)
-test_generator = test_datagen.flow_from_directory(
-    test_dir, target_size=img_size, batch_size=32, class_mode='categorical', shuffle=False
-)
+# Bump whenever loading/resizing/normalisation changes so stale cached predictions are ignored
+PREPROCESS_VERSIONS = {
+    3: "rgb-48x48-nearest-rescale255-v1",
+    1: "gray-48x48-nearest-rescale255-v1",
+}
+
+# ITU-R 601 luma weights, as used by PIL's convert("L") for grayscale loading
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+def model_channels(model):
+    """Return the number of input channels a model expects."""
+    return model.input_shape[-1]
+
+def load_image(image_path, channels=3):
+    """Load and preprocess a single image the same way the test generator does."""
+    img = load_img(image_path, target_size=img_size, color_mode=COLOR_MODES[channels])
+    return img_to_array(img) / 255.0  # Normalize
+
+def match_channels(images, channels):
+    """Convert a (N, H, W[, C]) image batch to the channel count a model expects."""
+    if images.ndim == 3:
+        images = images[..., np.newaxis]
+    if images.shape[-1] == channels:
+        return images
+    if channels == 1:
+        return (images @ LUMA_WEIGHTS)[..., np.newaxis]
+    return np.repeat(images, channels, axis=-1)
+
+def predict_images(model, image_paths, cache=None, batch_size=32):
+    """Predict class probabilities for image files, reusing cached results when possible."""
+    num_classes = model.output_shape[-1]
+    channels = model_channels(model)
+    results = np.zeros((len(image_paths), num_classes), dtype=np.float32)
+    pending = []  # (row, content hash) for images not in the cache
+
+    for row, image_path in enumerate(image_paths):
+        image_hash = file_hash(image_path)
+        cached = cache.get(image_hash) if cache is not None else None
+        if cached is not None:
+            results[row] = cached
+        else:
+            pending.append((row, image_hash))
 
-# Evaluate Model
-loss, accuracy = model.evaluate(test_generator)
-print(f"✅ Model Evaluation: Loss = {loss:.4f}, Accuracy = {accuracy:.4%}")
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        batch = np.stack([load_image(image_paths[row], channels) for row, _ in chunk])
+        probs = model.predict_on_batch(batch)
+        for (row, image_hash), p in zip(chunk, probs):
+            results[row] = p
+            if cache is not None:
+                cache.put(image_hash, p)
 
-# Predict on a Few Sample Images
-emotion_classes = list(test_generator.class_indices.keys())  # Get class labels
+    if cache is not None:
+        cache.flush()
+    return results
 
-def predict_emotion(image_path):
+def predict_emotion(model, image_path, emotion_classes, cache=None):
     """Loads an image, preprocesses it, and predicts the emotion."""
-    img = load_img(image_path, target_size=img_size)
-    img_array = img_to_array(img) / 255.0  # Normalize
-    img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
-    
-    prediction = model.predict(img_array)
+    prediction = predict_images(model, [image_path], cache=cache)
     predicted_class = emotion_classes[np.argmax(prediction)]
-    
+
     # Show Image & Prediction
-    plt.imshow(img)
+    plt.imshow(load_img(image_path, target_size=img_size))
     plt.title(f"Predicted Emotion: {predicted_class}")
     plt.axis("off")
-    plt.show()python3 -c "import tensorflow as tf; print(tf.config.list_physical_devices('GPU'))"
+    plt.show()
+    return predicted_class
+
+def iter_generator_batches(generator):
+    """Yield (images, labels) batches from a Keras directory iterator."""
+    for i in range(len(generator)):
+        images, labels = generator[i]
+        yield images, labels
+
+def iter_shard_batches(shard_path, batch_size=256, channels=None):
+    """Yield normalised (images, labels) batches from a packed .npz shard.
+
+    If channels is given, batches are converted to that many channels.
+    """
+    with np.load(shard_path) as shard:
+        images = shard["images"]
+        labels = shard["labels"]
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size].astype(np.float32) / 255.0
+        if channels is not None:
+            batch = match_channels(batch, channels)
+        elif batch.ndim == 3:
+            batch = batch[..., np.newaxis]
+        yield batch, labels[start:start + batch_size]
+
+def shard_classes(shard_path):
+    """Return the class names stored in a packed shard."""
+    with np.load(shard_path) as shard:
+        return [str(c) for c in shard["classes"]]
+
+def evaluation_report(model, batches, class_names):
+    """Run one streaming prediction pass and return a metrics and timing report."""
+    accumulator = EvaluationAccumulator(class_names)
+    load_time = 0.0
+    predict_time = 0.0
+    num_batches = 0
+
+    start = time.perf_counter()
+    batch_start = start
+    for images, labels in batches:
+        loaded = time.perf_counter()
+        probs = model.predict_on_batch(images)
+        predicted = time.perf_counter()
+        accumulator.update(labels, probs)
+
+        load_time += loaded - batch_start
+        predict_time += predicted - loaded
+        num_batches += 1
+        batch_start = time.perf_counter()
+    total_time = time.perf_counter() - start
+
+    report = accumulator.report()
+    report["timing"] = {
+        "total_s": total_time,
+        "load_s": load_time,
+        "predict_s": predict_time,
+        "batches": num_batches,
+        "images_per_sec": accumulator.count / predict_time if predict_time > 0 else 0.0,
+    }
+    return report
+
+def sample_images(frames_dir, count=4):
+    """Pick count frames spread over an extraction directory, via its manifest if it has one."""
+    paths = [row["path"] for row in read_manifest(frames_dir)]
+    if not paths and os.path.isdir(frames_dir):
+        paths = sorted(os.path.join(frames_dir, n) for n in os.listdir(frames_dir) if n.lower().endswith(".jpg"))
+    if len(paths) <= count:
+        return paths
+    return [paths[int(i * len(paths) / count)] for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the emotion model and predict sample images')
+    parser.add_argument('images', nargs='*',
+                        help='Sample images to predict (default: a few frames from --frames-dir)')
+    parser.add_argument('--frames-dir', type=str, default='data',
+                        help='Frames written by extract.py to sample when no images are given (default: data)')
+    parser.add_argument('--model', type=str, default=model_path, help='Path to the trained model')
+    parser.add_argument('--test-dir', type=str, default=test_dir, help='Labelled test image directory')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the on-disk prediction cache')
+    parser.add_argument('--cache-size', type=int, default=50000,
+                        help='Maximum number of cached predictions (default: 50000)')
+    parser.add_argument('--report', type=str, default=None,
+                        help='Run a streaming evaluation pass and write a JSON report to this path')
+    parser.add_argument('--shard', type=str, default=None,
+                        help='Evaluate a packed .npz shard instead of --test-dir (with --report)')
+    parser.add_argument('--batch-size', type=int, default=32, help='Prediction batch size (default: 32)')
+    parser.add_argument('--compile', choices=["none", "graph", "xla"], default="none",
+                        help='Run prediction through a traced graph or XLA-compiled function '
+                             'with a fixed batch size (default: none)')
+    args = parser.parse_args()
+
+    print(tf.config.list_physical_devices('GPU'))
+
+    # Load Trained Model
+    model = tf.keras.models.load_model(args.model)
+    channels = model_channels(model)
+    color_mode = COLOR_MODES[channels]
+    predictor = model
+    if args.compile != "none":
+        from compiled import CompiledPredictor
+        predictor = CompiledPredictor(model, args.batch_size, jit_compile=(args.compile == "xla"))
+        print(f"Compiled predict step ({args.compile}) in {predictor.warm_up():.2f}s")
+
+    if args.report:
+        if args.shard:
+            class_names = shard_classes(args.shard)
+            batches = iter_shard_batches(args.shard, args.batch_size, channels)
+            source = args.shard
+        else:
+            generator = ImageDataGenerator(rescale=1./255).flow_from_directory(
+                args.test_dir, target_size=img_size, batch_size=args.batch_size,
+                class_mode='categorical', shuffle=False, color_mode=color_mode
+            )
+            class_names = list(generator.class_indices.keys())
+            batches = iter_generator_batches(generator)
+            source = args.test_dir
+
+        report = evaluation_report(predictor, batches, class_names)
+        report["model"] = {"path": args.model, "sha1": file_hash(args.model), "channels": channels}
+        report["source"] = source
+        report["batch_size"] = args.batch_size
+        report["compile"] = args.compile
+        report["created"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Accuracy = {report['accuracy']:.4%}, ECE = {report['calibration']['ece']:.4f}, "
+              f"{report['timing']['images_per_sec']:.1f} images/sec")
+        print(f"Report written to {args.report}")
+        return
+
+    cache = None
+    if not args.no_cache:
+        cache = PredictionCache(args.model, PREPROCESS_VERSIONS[channels], model.output_shape[-1],
+                                max_entries=args.cache_size)
+
+    # Data Preprocessing for Testing
+    test_datagen = ImageDataGenerator(rescale=1./255)
+    test_generator = test_datagen.flow_from_directory(
+        args.test_dir, target_size=img_size, batch_size=32, class_mode='categorical', shuffle=False,
+        color_mode=color_mode
+    )
+    emotion_classes = list(test_generator.class_indices.keys())  # Get class labels
+
+    # Evaluate Model from (cached) per-image predictions
+    probs = predict_images(predictor, test_generator.filepaths, cache=cache, batch_size=args.batch_size)
+    labels = np.asarray(test_generator.classes)
+    accuracy = float(np.mean(np.argmax(probs, axis=1) == labels)) if len(labels) else 0.0
+    loss = float(-np.mean(np.log(np.clip(probs[np.arange(len(labels)), labels], 1e-7, 1.0)))) if len(labels) else 0.0
+    print(f"✅ Model Evaluation: Loss = {loss:.4f}, Accuracy = {accuracy:.4%}")
+    if cache is not None:
+        print(f"Prediction cache: {cache.hits} hits, {cache.misses} misses, {len(cache)} entries")
 
-# Test on Sample Images (Change filenames as needed)
-sample_images = ["data\frame_0_00_1.jpg,data\frame_0_00_10.jpg,data\frame_0_00_3.jpg,data\frame_0_00_13.jpg"]
+    # Test on Sample Images
+    for img_path in args.images or sample_images(args.frames_dir):
+        if os.path.exists(img_path):
+            predict_emotion(predictor, img_path, emotion_classes, cache=cache)
+        else:
+            print(f"Sample image not found: {img_path}")
 
-for img_path in sample_images:
-    predict_emotion(img_path)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import numpy as np
+from cache import PredictionCache
+
+def make_cache(tmp_path, max_entries=10):
+    model = tmp_path / "model.h5"
+    if not model.exists():
+        model.write_bytes(b"weights")
+    return PredictionCache(str(model), "v1", 3, cache_dir=str(tmp_path / "cache"), max_entries=max_entries)
+
+def test_get_returns_stored_probabilities(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("a") is None
+    cache.put("a", [0.1, 0.2, 0.7])
+    np.testing.assert_allclose(cache.get("a"), [0.1, 0.2, 0.7], rtol=1e-6)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_full_cache_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_entries=10)
+    for i in range(10):
+        cache.put(str(i), [i, 0, 0])
+    cache.get("0")  # touch the oldest entry so it survives
+    cache.put("new", [1, 1, 1])
+    # One tenth of the slots is freed at a time, oldest first
+    assert cache.get("0") is not None
+    assert cache.get("1") is None
+    assert cache.get("2") is not None
+    assert len(cache) == 10
+
+def test_entries_survive_reopening(tmp_path):
+    with make_cache(tmp_path) as cache:
+        cache.put("a", [0.5, 0.25, 0.25])
+    reopened = make_cache(tmp_path)
+    np.testing.assert_allclose(reopened.get("a"), [0.5, 0.25, 0.25])
+
+def test_different_model_does_not_hit(tmp_path):
+    with make_cache(tmp_path) as cache:
+        cache.put("a", [1, 0, 0])
+    (tmp_path / "model.h5").write_bytes(b"retrained")
+    assert make_cache(tmp_path).get("a") is None
+
+def test_changed_capacity_starts_fresh(tmp_path):
+    with make_cache(tmp_path, max_entries=10) as cache:
+        cache.put("a", [1, 0, 0])
+    assert make_cache(tmp_path, max_entries=20).get("a") is None
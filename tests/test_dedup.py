@@ -0,0 +1,43 @@
+import random
+from dedup import MultiIndexHash
+
+def flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+def test_finds_hash_within_threshold():
+    index = MultiIndexHash(threshold=4)
+    original = 0x0123456789ABCDEF
+    assert index.add(original) == 0
+    # Spread the differing bits over several chunks
+    assert index.query(flip(original, [0, 17, 40, 63])) == 0
+
+def test_rejects_hash_beyond_threshold():
+    index = MultiIndexHash(threshold=4)
+    original = 0x0123456789ABCDEF
+    index.add(original)
+    assert index.query(flip(original, [0, 13, 26, 39, 52])) is None
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    threshold = 6
+    index = MultiIndexHash(threshold)
+    stored = [rng.getrandbits(64) for _ in range(200)]
+    for value in stored:
+        index.add(value)
+    for _ in range(300):
+        base = rng.choice(stored)
+        query = flip(base, rng.sample(range(64), rng.randint(0, 10)))
+        match = index.query(query)
+        within = [i for i, v in enumerate(stored) if (v ^ query).bit_count() <= threshold]
+        if within:
+            assert match in within
+        else:
+            assert match is None
+
+def test_zero_threshold_is_exact_match():
+    index = MultiIndexHash(threshold=0)
+    index.add(5)
+    assert index.query(5) == 0
+    assert index.query(4) is None
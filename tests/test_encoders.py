@@ -0,0 +1,37 @@
+from encoders import frame_indices, profile_size, profile_fps
+
+def test_frame_indices_keeps_everything_when_not_reducing():
+    assert list(frame_indices(5, 20, 30)) == [0, 1, 2, 3, 4]
+
+def test_frame_indices_halves_the_rate():
+    assert frame_indices(10, 30, 15) == [0, 2, 4, 6, 8]
+
+def test_frame_indices_fractional_step():
+    indices = frame_indices(30, 30, 20)
+    assert len(indices) == 20
+    assert indices == sorted(set(indices))
+    assert indices[-1] < 30
+
+def test_frame_indices_too_short_for_one_output_frame():
+    assert frame_indices(1, 30, 20) == [0]
+    assert frame_indices(1, 30, 15) == [0]
+
+def test_frame_indices_rate_just_above_the_cap():
+    # The app passes the measured capture rate, often a little above the profile's cap
+    assert frame_indices(1, 30.4, 30) == [0]
+    assert len(frame_indices(300, 30.4, 30)) == 297
+
+def test_frame_indices_keeps_the_last_partial_step():
+    assert frame_indices(5, 60, 15) == [0, 4]
+
+def test_frame_indices_empty():
+    assert frame_indices(0, 60, 15) == []
+
+def test_profile_size_is_even_and_capped():
+    assert profile_size(1280, 720, "compact") == (852, 480)
+    assert profile_size(641, 481, "archive") == (640, 480)
+
+def test_profile_fps():
+    assert profile_fps(60, "standard") == 30
+    assert profile_fps(15, "standard") == 15
+    assert profile_fps(60, "archive") == 60
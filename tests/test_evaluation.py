@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from evaluation import EvaluationAccumulator
+
+def test_confusion_matrix_from_batches():
+    acc = EvaluationAccumulator(["a", "b", "c"])
+    acc.update([0, 1], [[0.8, 0.1, 0.1], [0.6, 0.3, 0.1]])
+    # One-hot labels are accepted too
+    acc.update(np.eye(3)[[2, 2]], [[0.1, 0.1, 0.8], [0.2, 0.7, 0.1]])
+    assert acc.confusion.tolist() == [[1, 0, 0], [1, 0, 0], [0, 1, 1]]
+    report = acc.report()
+    assert report["samples"] == 4
+    assert report["accuracy"] == 0.5
+    assert report["per_class"]["a"] == {"precision": 0.5, "recall": 1.0, "f1": pytest.approx(2 / 3), "support": 1}
+    assert report["per_class"]["b"]["f1"] == 0.0
+
+def test_empty_batch_and_empty_report():
+    acc = EvaluationAccumulator(["a", "b"])
+    acc.update([], np.zeros((0, 2)))
+    report = acc.report()
+    assert report["samples"] == 0
+    assert report["accuracy"] == 0.0
+    assert report["calibration"]["ece"] == 0.0
+
+def test_ece_of_perfectly_calibrated_predictions_is_zero():
+    acc = EvaluationAccumulator(["a", "b"], num_bins=10)
+    # Confidence 0.75, right three times out of four
+    acc.update([0, 0, 0, 1], [[0.75, 0.25]] * 4)
+    assert acc.calibration()["ece"] == pytest.approx(0.0)
+
+def test_ece_of_overconfident_predictions():
+    acc = EvaluationAccumulator(["a", "b"], num_bins=10)
+    acc.update([0, 1], [[0.95, 0.05], [0.95, 0.05]])
+    calibration = acc.calibration()
+    assert calibration["ece"] == pytest.approx(0.45)
+    assert calibration["bins"][9]["count"] == 2
+
+def test_confidence_of_one_falls_in_last_bin():
+    acc = EvaluationAccumulator(["a", "b"], num_bins=10)
+    acc.update([0], [[1.0, 0.0]])
+    assert acc.calibration()["bins"][9]["count"] == 1
@@ -0,0 +1,48 @@
+import os
+import extract
+from extract import frame_filename, read_manifest, write_manifest
+
+def frame(tmp_path, source, timestamp):
+    name = frame_filename(source, int(timestamp * 10), timestamp)
+    (tmp_path / name).write_bytes(b"jpg")
+    return {"frame_index": int(timestamp * 10), "timestamp": timestamp, "source": source, "file": name}
+
+def test_frame_filename_tells_same_named_videos_apart():
+    a = frame_filename("/videos/a/journal.mp4", 10, 1.0)
+    b = frame_filename("/videos/b/journal.mp4", 10, 1.0)
+    assert a != b
+    assert a.startswith("journal_") and a.endswith("_frame_000010_1000ms.jpg")
+
+def test_missing_manifest_is_empty(tmp_path):
+    assert read_manifest(str(tmp_path)) == []
+
+def test_rows_of_other_sources_are_kept(tmp_path):
+    write_manifest(str(tmp_path), "a.mp4", [frame(tmp_path, "a.mp4", 0.0)])
+    write_manifest(str(tmp_path), "b.mp4", [frame(tmp_path, "b.mp4", 0.0)])
+    rows = read_manifest(str(tmp_path))
+    assert [r["source"] for r in rows] == ["a.mp4", "b.mp4"]
+    assert rows[0]["path"] == os.path.join(str(tmp_path), rows[0]["file"])
+
+def test_rerun_keeps_earlier_frames_without_replace(tmp_path):
+    old = [frame(tmp_path, "a.mp4", t) for t in (0.0, 1.0, 2.0)]
+    write_manifest(str(tmp_path), "a.mp4", old)
+    write_manifest(str(tmp_path), "a.mp4", [frame(tmp_path, "a.mp4", 1.5)], covered=(1.0, 2.0))
+    assert [r["timestamp"] for r in read_manifest(str(tmp_path))] == [0.0, 1.0, 2.0, 1.5]
+
+def test_replace_only_deletes_inside_the_covered_range(tmp_path):
+    old = [frame(tmp_path, "a.mp4", t) for t in (0.0, 1.0, 2.0, 3.0)]
+    write_manifest(str(tmp_path), "a.mp4", old)
+    new = [frame(tmp_path, "a.mp4", 1.0)]
+    write_manifest(str(tmp_path), "a.mp4", new, covered=(1.0, 2.5), replace=True)
+    assert sorted(r["timestamp"] for r in read_manifest(str(tmp_path))) == [0.0, 1.0, 3.0]
+    assert not os.path.exists(tmp_path / old[2]["file"])
+    assert os.path.exists(tmp_path / old[3]["file"])
+
+def test_deleted_frames_are_left_out(tmp_path):
+    rows = [frame(tmp_path, "a.mp4", t) for t in (0.0, 1.0)]
+    write_manifest(str(tmp_path), "a.mp4", rows)
+    os.remove(tmp_path / rows[0]["file"])
+    assert [r["timestamp"] for r in read_manifest(str(tmp_path))] == [1.0]
+
+def test_manifest_name():
+    assert extract.MANIFEST_NAME == "manifest.jsonl"
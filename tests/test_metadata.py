@@ -0,0 +1,41 @@
+import json
+import os
+import pytest
+from utils import format_metadata, read_metadata, metadata_version, METADATA_VERSION
+
+def write(tmp_path, data, name="entry.txt"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+@pytest.mark.parametrize("body", ["", "Short day.", "é" * 500, "line one\nline two\n"])
+def test_v2_round_trip(tmp_path, body):
+    path = write(tmp_path, format_metadata("Title", "2024-03-01 09:30:00", "Calm", body))
+    entry = read_metadata(path)
+    assert entry == {"title": "Title", "date": "2024-03-01 09:30:00", "emotion": "Calm", "journal_content": body}
+    assert metadata_version(path) == METADATA_VERSION
+
+def test_body_offset_points_past_the_header():
+    # The offset's own digits lengthen the header line; crossing from 2 to 3 digits
+    # is where a one-pass computation would be off by one
+    for length in range(60, 140):
+        data = format_metadata("t" * length, "2024-01-01 00:00:00", "Happy", "body")
+        header = json.loads(data.split(b"\n", 1)[0])
+        assert data[header["body_offset"]:] == b"body"
+        assert header["body_offset"] == len(data.split(b"\n", 1)[0]) + 1
+
+def test_header_only_read(tmp_path):
+    path = write(tmp_path, format_metadata("Title", "2024-03-01 09:30:00", "Sad", "private text"))
+    assert read_metadata(path, body=False)["journal_content"] == ""
+
+def test_v1_sidecar(tmp_path):
+    path = write(tmp_path, b"Title: Old entry\r\nDate: 2023-05-06 07:08:09\r\nEmotion: Happy\r\n\r\nFirst\r\nSecond")
+    entry = read_metadata(path)
+    assert entry == {"title": "Old entry", "date": "2023-05-06 07:08:09", "emotion": "Happy",
+                     "journal_content": "First\nSecond"}
+    assert metadata_version(path) == 1
+
+def test_missing_date_uses_file_mtime(tmp_path):
+    path = write(tmp_path, b"Title: Undated\nEmotion: Sad\n\nText")
+    os.utime(path, (1700000000, 1700000000))
+    assert read_metadata(path)["date"].startswith("2023-11-")
@@ -0,0 +1,27 @@
+from encoders import timestamp_indices
+
+def test_timestamp_indices_empty():
+    assert timestamp_indices([], 20) == []
+
+def test_timestamp_indices_single_frame():
+    assert timestamp_indices([3.0], 20) == [0]
+
+def test_timestamp_indices_repeats_until_the_next_frame():
+    assert timestamp_indices([0, 0.1, 0.5, 1.0], 10) == [0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3]
+
+def test_timestamp_indices_starts_at_the_first_frame():
+    # Capture times are relative to when recording started, not to the first kept frame
+    assert timestamp_indices([0.25, 0.35], 10) == [0, 1]
+
+def test_motion_score():
+    import numpy as np
+    from utils import motion_thumbnail, motion_score
+
+    still = np.zeros((480, 640, 3), np.uint8)
+    moved = still.copy()
+    moved[200:240, 300:340] = 200
+    noisy = (still.astype(int) + np.random.default_rng(0).integers(-8, 9, still.shape)).clip(0, 255).astype(np.uint8)
+    base = motion_thumbnail(still)
+    assert motion_score(base, base) == 0.0
+    assert motion_score(base, motion_thumbnail(noisy)) == 0.0
+    assert motion_score(base, motion_thumbnail(moved)) > 0.003
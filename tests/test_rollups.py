@@ -0,0 +1,42 @@
+import datetime
+from rollups import EmotionRollups, day_key, week_key
+
+def test_keys():
+    assert day_key("2024-02-29 10:00:00") == "2024-02-29"
+    assert day_key("") is None
+    assert day_key("not a date") is None
+    assert week_key("2024-12-30") == "2025-W01"
+
+def test_streaks(tmp_path):
+    rollups = EmotionRollups(str(tmp_path))
+    for i, day in enumerate(["2024-03-01", "2024-03-02", "2024-03-03", "2024-03-05", "2024-03-06"]):
+        rollups.add(f"e{i}", f"{day} 12:00:00", "Happy")
+    assert rollups.streaks(today=datetime.date(2024, 3, 6)) == (2, 3)
+    # Yesterday's entry still counts as a current streak, two days ago does not
+    assert rollups.streaks(today=datetime.date(2024, 3, 7)) == (2, 3)
+    assert rollups.streaks(today=datetime.date(2024, 3, 8)) == (0, 3)
+
+def test_several_entries_on_one_day_count_once_for_streaks(tmp_path):
+    rollups = EmotionRollups(str(tmp_path))
+    rollups.add("a", "2024-03-01 08:00:00", "Happy")
+    rollups.add("b", "2024-03-01 20:00:00", "Sad")
+    assert rollups.streaks(today=datetime.date(2024, 3, 1)) == (1, 1)
+
+def test_no_entries(tmp_path):
+    assert EmotionRollups(str(tmp_path)).streaks() == (0, 0)
+
+def test_remove_and_readd(tmp_path):
+    rollups = EmotionRollups(str(tmp_path))
+    rollups.add("a", "2024-03-01 08:00:00", "Happy")
+    rollups.add("a", "2024-03-02 08:00:00", "Sad")
+    assert rollups.daily == {"2024-03-02": {"Sad": 1}}
+    rollups.remove("a")
+    assert rollups.daily == {} and rollups.weekly == {}
+
+def test_sync_with_index_docs(tmp_path):
+    rollups = EmotionRollups(str(tmp_path))
+    rollups.add("gone", "2024-03-01 08:00:00", "Happy")
+    docs = {"kept": {"date": "2024-03-04 08:00:00", "emotion": "Calm"}}
+    assert rollups.sync(docs)
+    assert not rollups.sync(docs)
+    assert rollups.weekly == {"2024-W10": {"Calm": 1}}
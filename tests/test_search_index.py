@@ -0,0 +1,64 @@
+import pytest
+from search_index import SearchIndex, tokenize
+from utils import format_metadata
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path))
+    index.add("park", "Walk in the park", "Happy", "2024-01-05 10:00:00", "sunny morning with the dog")
+    index.add("work", "Long day", "Anxious", "2024-01-06 18:00:00", "deadline at work, the park was closed")
+    index.add("dog", "Vet visit", "Sad", "2024-01-07 12:00:00", "the dog is ill")
+    return index
+
+def test_tokenize():
+    assert tokenize("Hello, World! It's 2024") == ["hello", "world", "it", "s", "2024"]
+
+def test_title_match_ranks_above_body_match(index):
+    assert index.search("park") == ["park", "work"]
+
+def test_all_words_must_match(index):
+    assert index.search("dog ill") == ["dog"]
+    assert index.search("dog deadline") == []
+
+def test_last_word_matches_as_prefix(index):
+    assert index.search("deadl") == ["work"]
+    assert index.search("deadl dog") == []
+
+def test_no_query_lists_newest_first(index):
+    assert index.search("") == ["dog", "work", "park"]
+
+def test_emotion_and_date_filters(index):
+    assert index.search("", emotion="Sad") == ["dog"]
+    assert index.search("", date_from="2024-01-06") == ["dog", "work"]
+    assert index.search("", date_to="2024-01-06") == ["work", "park"]
+    assert index.search("the", date_from="2024-01-06", date_to="2024-01-06") == ["work"]
+
+def test_readding_replaces_old_terms(index):
+    index.add("park", "Renamed", "Calm", "2024-01-05 10:00:00", "")
+    assert index.search("walk") == []
+    assert index.search("renamed") == ["park"]
+
+def test_remove(index):
+    index.remove("dog")
+    assert index.search("dog") == ["park"]
+    assert index.emotions() == ["Anxious", "Happy"]
+
+def test_facet_counts(index):
+    assert index.facet_counts(index.search("the")) == {"Happy": 1, "Anxious": 1, "Sad": 1}
+
+def test_refresh_reads_new_and_skips_corrupt_sidecars(tmp_path):
+    (tmp_path / "good.mp4").write_bytes(b"video")
+    (tmp_path / "good.txt").write_bytes(format_metadata("Good", "2024-02-01 08:00:00", "Happy", "fine"))
+    (tmp_path / "bad.mp4").write_bytes(b"video")
+    (tmp_path / "bad.txt").write_bytes(b'{"version": 2, "title": "trunc')
+    (tmp_path / ".hidden.saving.mp4").write_bytes(b"partial")
+    index = SearchIndex(str(tmp_path))
+    assert index.refresh()
+    assert sorted(index.docs) == ["bad", "good"]
+    assert index.docs["bad"]["emotion"] == "Not specified"
+    # Nothing changed on disk, so the corrupt sidecar is not re-read
+    assert not index.refresh()
+
+def test_saved_index_is_reloaded(index, tmp_path):
+    index.save()
+    assert SearchIndex(str(tmp_path)).search("park") == ["park", "work"]
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from encoders import (STORAGE_PROFILES, DEFAULT_STORAGE_PROFILE, find_ffmpeg, ffmpeg_codec,
+                      codec_args, profile_size, profile_fps, frame_indices)
+from utils import ensure_dir
+
+videos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
+
+# Remembers which profile each file was last re-encoded to, so reruns skip it
+STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "transcode.json")
+
+# Files modified more recently than this may still be being saved
+MIN_AGE_SECONDS = 60
+
+# Re-encodes are written to hidden ".<entry>.transcode.mp4" files, which the
+# history, search index and dataset tools all skip, and renamed over the original
+TEMP_MARKER = ".transcode"
+
+def _transcode_ffmpeg(video_path, temp_path, size, fps, profile, threads):
+    codec = ffmpeg_codec()
+    settings = STORAGE_PROFILES[profile]
+    width, height = size
+    command = [
+        find_ffmpeg(), "-hide_banner", "-loglevel", "error", "-y", "-i", video_path,
+        "-vf", f"scale={width}:{height}:flags=area,fps={fps:.3f}",
+        "-an", "-c:v", codec,
+    ] + codec_args(codec, settings["preset"], settings["crf"]) + [
+        "-threads", str(threads), "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+        temp_path,
+    ]
+    subprocess.run(command, check=True, capture_output=True)
+
+def _transcode_opencv(video_path, temp_path, size, source_fps, fps, frame_count):
+    import cv2
+
+    # Without ffmpeg only frame size and rate can shrink; the codec stays mp4v
+    cap = cv2.VideoCapture(video_path)
+    out = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    keep = set(frame_indices(frame_count, source_fps, fps))
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index in keep:
+            if (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            out.write(frame)
+        index += 1
+    cap.release()
+    out.release()
+
+def transcode_file(video_path, profile, threads=1):
+    """Re-encode one video to a storage profile and report the space saved."""
+    import cv2
+
+    start = time.perf_counter()
+    original_bytes = os.path.getsize(video_path)
+    report = {"file": os.path.basename(video_path), "profile": profile,
+              "original_bytes": original_bytes, "new_bytes": original_bytes,
+              "saved_bytes": 0, "seconds": 0.0, "status": "kept"}
+
+    directory, name = os.path.split(video_path)
+    temp_path = os.path.join(directory, f".{name[:-len('.mp4')]}{TEMP_MARKER}.mp4")
+    try:
+        cap = cv2.VideoCapture(video_path)
+        opened = cap.isOpened()
+        source_fps = cap.get(cv2.CAP_PROP_FPS) or 20
+        source_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if not opened or source_size[0] <= 0:
+            report["status"] = "unreadable"
+            return report
+
+        size = profile_size(*source_size, profile)
+        fps = profile_fps(source_fps, profile)
+        if find_ffmpeg() and ffmpeg_codec():
+            _transcode_ffmpeg(video_path, temp_path, size, fps, profile, threads)
+        else:
+            _transcode_opencv(video_path, temp_path, size, source_fps, fps, frame_count)
+
+        new_bytes = os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
+        # Only replace the original when the result is valid and actually smaller
+        if 1000 < new_bytes < original_bytes:
+            os.replace(temp_path, video_path)
+            report.update(new_bytes=new_bytes, saved_bytes=original_bytes - new_bytes,
+                          status="transcoded")
+    except subprocess.CalledProcessError as e:
+        report["status"] = f"error: {e.stderr.decode(errors='replace').strip() or str(e)}"
+    except Exception as e:
+        # A corrupt file (or cv2.error) fails this file only, not the whole batch
+        report["status"] = f"error: {str(e)}"
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+def recover(directory, min_age=3600):
+    """Delete temporary files left behind by transcodes interrupted by a crash."""
+    now = time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        # Older versions used a visible "<entry>.transcode.mp4" name
+        leftover = name.startswith(".") and TEMP_MARKER in name or name.endswith(f"{TEMP_MARKER}.mp4")
+        if leftover and now - os.path.getmtime(path) > min_age:
+            print(f"Removing incomplete transcode {name}")
+            os.remove(path)
+
+def load_state():
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    ensure_dir(os.path.dirname(STATE_PATH))
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+def pending_videos(directory, profile, state, force=False):
+    """List videos that have not already been transcoded to this profile."""
+    now = time.time()
+    pending = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".mp4") or name.endswith(f"{TEMP_MARKER}.mp4") or name.startswith("."):
+            continue
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        if now - stat.st_mtime < MIN_AGE_SECONDS:
+            continue
+        done = state.get(name)
+        if not force and done and done["profile"] == profile and done["size"] == stat.st_size:
+            continue
+        pending.append(path)
+    return pending
+
+def format_bytes(count):
+    return f"{count / (1024 * 1024):.1f} MB"
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-encode existing journal videos to a storage profile')
+    parser.add_argument('--profile', choices=sorted(STORAGE_PROFILES), default=DEFAULT_STORAGE_PROFILE,
+                        help=f'Target storage profile (default: {DEFAULT_STORAGE_PROFILE})')
+    parser.add_argument('--videos', type=str, default=videos_dir, help='Journal videos directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Files encoded in parallel (default: number of CPU cores)')
+    parser.add_argument('--force', action='store_true', help='Re-encode files already at this profile')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the files that would be encoded')
+    args = parser.parse_args()
+
+    recover(args.videos)
+    state = load_state()
+    videos = pending_videos(args.videos, args.profile, state, args.force)
+    print(f"{len(videos)} videos to transcode to '{args.profile}' with {args.workers} workers")
+    if args.dry_run:
+        for path in videos:
+            print(f"  {os.path.basename(path)} ({format_bytes(os.path.getsize(path))})")
+        return
+
+    # Share the cores between parallel jobs instead of letting each ffmpeg use all of them
+    threads = max(1, (os.cpu_count() or 1) // max(1, min(args.workers, len(videos) or 1)))
+    start = time.perf_counter()
+    total_original = total_saved = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(transcode_file, path, args.profile, threads): path for path in videos}
+        for future in as_completed(futures):
+            try:
+                report = future.result()
+            except Exception as e:
+                # e.g. a worker process killed mid-file
+                print(f"{os.path.basename(futures[future])}: error: {str(e)}")
+                continue
+            total_original += report["original_bytes"]
+            total_saved += report["saved_bytes"]
+            print(f"{report['file']}: {report['status']}, {format_bytes(report['original_bytes'])} -> "
+                  f"{format_bytes(report['new_bytes'])} (saved {format_bytes(report['saved_bytes'])}) "
+                  f"in {report['seconds']:.1f}s")
+            if report["status"] in ("transcoded", "kept"):
+                state[report["file"]] = {"profile": args.profile, "size": report["new_bytes"]}
+                save_state(state)
+
+    print(f"Saved {format_bytes(total_saved)} of {format_bytes(total_original)} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
-import cv2
 import os
 import datetime
-import numpy as np
+import json
+import time
 from pathlib import Path
+import instrument
+
+# cv2 and PIL are imported inside the functions that use them so that importing
+# this module (e.g. for read_metadata) stays cheap during app start-up.
 
 def ensure_dir(directory):
     """Ensure that a directory exists."""
@@ -12,8 +16,159 @@ def get_timestamp():
     """Get a formatted timestamp for filenames."""
     return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
-def save_video(frames, fps=20, output_path=None):
-    """Save frames as a video file."""
+def frame_to_preview(frame, width, height):
+    """Convert a BGR camera frame into a PIL image fitted to width x height."""
+    import cv2
+    import PIL.Image
+    
+    # Convert to format Tkinter can display
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    img = PIL.Image.fromarray(frame)
+
+    # Use default size if widget not properly sized yet
+    if width < 10:
+        width = 640
+        height = 480
+
+    # Maintain aspect ratio
+    img_ratio = frame.shape[1] / frame.shape[0]
+    if width / height > img_ratio:
+        new_width = int(height * img_ratio)
+        new_height = height
+    else:
+        new_width = width
+        new_height = int(width / img_ratio)
+
+    # Resize the image
+    return img.resize((new_width, new_height), PIL.Image.LANCZOS)
+
+# Motion-gated recording compares frames on a tiny grayscale copy; area
+# averaging also smooths out most sensor noise
+MOTION_SIZE = (64, 36)
+# Brightness change (0-255) for a thumbnail pixel to count as moved
+MOTION_LEVEL = 12
+
+def motion_thumbnail(frame):
+    """Small grayscale copy of a BGR frame for motion_score."""
+    import cv2
+    
+    small = cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+def motion_score(previous, current, level=MOTION_LEVEL):
+    """Fraction of thumbnail pixels whose brightness changed by more than level.
+
+    Counting changed pixels rather than averaging the difference keeps small
+    local movements (lips, eyes) from being drowned out by a still background.
+    """
+    import cv2
+    
+    return float((cv2.absdiff(previous, current) > level).mean())
+
+# Version 2 sidecars start with a one-line JSON header giving the title, date,
+# emotion and the byte range of the journal text that follows it. Files without
+# the header are the original "Title:/Date:/Emotion:" text format (version 1).
+METADATA_VERSION = 2
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def format_metadata(title, date, emotion, journal_content):
+    """Return the bytes of a version 2 sidecar."""
+    body = journal_content.encode("utf-8")
+    header = {"version": METADATA_VERSION, "title": title, "date": date, "emotion": emotion,
+              "body_offset": 0, "body_length": len(body)}
+    # The body starts right after the header line, whose length depends on the offset itself
+    while True:
+        line = (json.dumps(header, ensure_ascii=False) + "\n").encode("utf-8")
+        if header["body_offset"] == len(line):
+            return line + body
+        header["body_offset"] = len(line)
+
+def metadata_version(metadata_file):
+    """Return the format version of a sidecar file."""
+    with open(metadata_file, "rb") as f:
+        first = f.readline()
+    if first.startswith(b"{"):
+        return json.loads(first).get("version", METADATA_VERSION)
+    return 1
+
+def read_metadata(metadata_file, body=True):
+    """Parse a journal sidecar file into title, date, emotion and journal content.
+
+    With body=False only the header is read (journal_content is ""), which is
+    all list views need. An entry without a date gets the file's modification
+    time, so it still sorts where it was written.
+    """
+    with instrument.span("metadata.parse"):
+        entry = _parse_metadata(metadata_file, body)
+    if not entry["date"]:
+        mtime = os.path.getmtime(metadata_file)
+        entry["date"] = datetime.datetime.fromtimestamp(mtime).strftime(DATE_FORMAT)
+    return entry
+
+def _parse_metadata(metadata_file, body):
+    entry = {
+        "title": "Untitled Entry",
+        "date": "",
+        "emotion": "Not specified",
+        "journal_content": "",
+    }
+
+    with open(metadata_file, "rb") as f:
+        first = f.readline()
+        if first.startswith(b"{"):
+            header = json.loads(first)
+            for key in ("title", "date", "emotion"):
+                if header.get(key):
+                    entry[key] = header[key]
+            if body:
+                f.seek(header["body_offset"])
+                entry["journal_content"] = f.read(header["body_length"]).decode("utf-8", errors="replace")
+            return entry
+
+        # Version 1: header lines up to the first blank line, then the journal text
+        line = first
+        while line and line.strip():
+            key, _, value = line.decode("utf-8", errors="replace").partition(":")
+            if key == "Title":
+                entry["title"] = value.strip()
+            elif key == "Date":
+                entry["date"] = value.strip()
+            elif key == "Emotion":
+                entry["emotion"] = value.strip()
+            line = f.readline()
+        if body and line:
+            entry["journal_content"] = f.read().decode("utf-8", errors="replace").replace("\r\n", "\n")
+    return entry
+
+class SaveCancelled(Exception):
+    """Raised by save_video when its cancel token is set."""
+
+def save_video(frames, fps=20, output_path=None, backend="auto", preset="balanced", threads=0,
+               profile=None, progress=None, cancel=None, progress_every=10, timestamps=None,
+               images_dir=None):
+    """Save frames as a video file.
+    
+    backend is "auto" (ffmpeg pipe when installed, else OpenCV), "ffmpeg" or
+    "opencv"; preset and threads only apply to the ffmpeg backend. A storage
+    profile (see encoders.STORAGE_PROFILES) caps resolution and frame rate and
+    overrides the preset. progress, if given, is called as progress(written, total)
+    every progress_every frames; cancel is a threading.Event checked at the same
+    points, and setting it makes save_video delete its output and raise
+    SaveCancelled.
+    
+    Returns the path of the video, or None if no video could be written. In
+    that case key frames are kept as images in images_dir (by default an
+    "images_<name>" folder next to output_path).
+    
+    timestamps, if given, are the capture times (seconds) of a motion-gated
+    recording that only kept frames that changed. Each kept frame is repeated
+    until the next one to restore real timing at fps; the ffmpeg backend drops
+    the repeats again and writes a variable-frame-rate file.
+    """
+    import cv2
+    from encoders import (FFmpegWriter, ffmpeg_codec, STORAGE_PROFILES, profile_size,
+                          profile_fps, frame_indices, timestamp_indices)
+    
     if not frames:
         print("No frames to save")
         return None
@@ -25,39 +180,87 @@ def save_video(frames, fps=20, output_path=None):
         output_path = os.path.join(videos_dir, f"journal_{timestamp}.mp4")
     
     try:
-        print(f"First frame shape: {frames[0].shape}, total frames: {len(frames)}")
+        instrument.log(f"First frame shape: {frames[0].shape}, total frames: {len(frames)}",
+                       frames=len(frames))
         height, width, _ = frames[0].shape
+        crf = None
+        vfr = timestamps is not None
+        if vfr:
+            # Repeats are references to the same array, not copies
+            frames = [frames[i] for i in timestamp_indices(timestamps, fps)]
+            instrument.log(f"Motion-gated: {len(timestamps)} stored frames span {len(frames)} at {fps:.1f} fps",
+                           stored=len(timestamps))
+        if profile:
+            # Drop frames up front; downscaling happens per frame in the write loop
+            settings = STORAGE_PROFILES[profile]
+            preset, crf = settings["preset"], settings["crf"]
+            out_fps = profile_fps(fps, profile)
+            frames = [frames[i] for i in frame_indices(len(frames), fps, out_fps)]
+            fps = out_fps
+            width, height = profile_size(width, height, profile)
+            instrument.log(f"Storage profile {profile}: {width}x{height} @ {fps:.1f} fps", profile=profile)
         
-        # Try multiple codecs if needed
+        # Try multiple codecs if needed; the ffmpeg pipe goes first when it is installed
         codecs = ['mp4v', 'X264', 'DIVX', 'XVID']
+        if backend == "ffmpeg":
+            codecs = ['ffmpeg']
+        elif backend == "auto" and ffmpeg_codec():
+            codecs = ['ffmpeg'] + codecs
         saved = False
         
         for codec in codecs:
+            # Create a temporary filename to avoid overwriting if multiple codecs are tried
+            temp_path = output_path.replace('.mp4', f'_{codec}.mp4')
+            out = None
             try:
-                print(f"Trying codec: {codec}")
-                # Create a temporary filename to avoid overwriting if multiple codecs are tried
-                temp_path = output_path.replace('.mp4', f'_{codec}.mp4')
+                instrument.log(f"Trying codec: {codec}", codec=codec)
                 
-                fourcc = cv2.VideoWriter_fourcc(*codec)
-                out = cv2.VideoWriter(temp_path, fourcc, fps, (width, height))
+                if codec == 'ffmpeg':
+                    out = FFmpegWriter(temp_path, fps, (width, height), preset=preset,
+                                       threads=threads, crf=crf, vfr=vfr)
+                else:
+                    fourcc = cv2.VideoWriter_fourcc(*codec)
+                    out = cv2.VideoWriter(temp_path, fourcc, fps, (width, height))
                 
                 # Check if VideoWriter was opened successfully
                 if not out.isOpened():
                     print(f"Failed to open VideoWriter with codec {codec}")
+                    out.release()
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
                     continue
                 
                 # Write frames
-                for frame in frames:
-                    if frame.shape[0] != height or frame.shape[1] != width:
-                        # Resize frame if dimensions don't match
-                        frame = cv2.resize(frame, (width, height))
-                    out.write(frame)
-                
-                out.release()
+                encode_start = time.perf_counter()
+                with instrument.span("encode.write", codec=codec, frames=len(frames)):
+                    total = len(frames)
+                    source = resized = None
+                    for written, frame in enumerate(frames, 1):
+                        if frame is source:
+                            # A repeated frame of a motion-gated recording; reuse its resize
+                            frame = resized
+                        else:
+                            source = frame
+                            if frame.shape[0] != height or frame.shape[1] != width:
+                                # Resize frame if dimensions don't match (or the profile downscales)
+                                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                            resized = frame
+                        out.write(frame)
+                        if written % progress_every == 0 or written == total:
+                            if cancel is not None and cancel.is_set():
+                                out.release()
+                                os.remove(temp_path)
+                                raise SaveCancelled()
+                            if progress is not None:
+                                progress(written, total)
+                    
+                    out.release()
+                instrument.record("encode.ms_per_frame",
+                                  (time.perf_counter() - encode_start) * 1000 / max(1, len(frames)), codec=codec)
                 
                 # Check if file was created successfully
                 if os.path.exists(temp_path) and os.path.getsize(temp_path) > 1000:  # Ensure file is not empty
-                    print(f"Successfully saved video with codec {codec}")
+                    instrument.log(f"Successfully saved video with codec {codec}", codec=codec)
                     # If a temporary path was used, rename to the requested output path
                     if temp_path != output_path:
                         os.rename(temp_path, output_path)
@@ -65,14 +268,24 @@ def save_video(frames, fps=20, output_path=None):
                     break
                 else:
                     print(f"Codec {codec} failed: file not created or too small")
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+            except SaveCancelled:
+                raise
             except Exception as e:
                 print(f"Error with codec {codec}: {str(e)}")
+                # Don't leave a half-written file behind for the next codec (or the user)
+                if out is not None:
+                    out.release()
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
         
         if not saved:
             print("All codecs failed, trying to save frames as images")
             # Fallback: Save key frames as images if video codecs all fail
-            images_dir = os.path.join(os.path.dirname(output_path), 
-                                     f"images_{os.path.basename(output_path).replace('.mp4', '')}")
+            if images_dir is None:
+                images_dir = os.path.join(os.path.dirname(output_path), 
+                                         f"images_{os.path.basename(output_path).replace('.mp4', '')}")
             ensure_dir(images_dir)
             
             # Save every 15th frame (about 1 frame per second at 15fps)
@@ -81,11 +294,15 @@ def save_video(frames, fps=20, output_path=None):
                     img_path = os.path.join(images_dir, f"frame_{i:04d}.jpg")
                     cv2.imwrite(img_path, frame)
             
+            # The images are only salvage; no video was written, so the save has failed
             print(f"Saved key frames as images in {images_dir}")
-            return output_path  # Return the intended video path even though we saved images
+            return None
         
         return output_path
         
+    except SaveCancelled:
+        print("Saving cancelled")
+        raise
     except Exception as e:
         print(f"Error saving video: {str(e)}")
         return None